@@ -3,19 +3,28 @@
 from __future__ import annotations
 
 import logging
-from datetime import timedelta
 
-from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryAuthFailed
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-
-from .const import CONF_PASSWORD, CONF_USERNAME, DOMAIN
-from .errors import ApiAuthError
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.typing import ConfigType
+
+from .const import (
+    CONF_PASSWORD,
+    CONF_SERVICE_ID,
+    CONF_SERVICE_TYPE,
+    CONF_USERNAME,
+    DOMAIN,
+    JABLOTRON_FUTURA_NAMESPACE,
+)
+from .coordinator import (
+    FuturaAccount,
+    FuturaCoordinator,
+    JablotronFuturaConfigEntry,
+    async_get_store,
+)
 from .futura import Futura
-
-type JablotronFuturaConfigEntry = ConfigEntry[FuturaCoordinator]
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,40 +36,128 @@ PLATFORMS: list[Platform] = [
     Platform.SWITCH,
 ]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Jablotron Futura services."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: JablotronFuturaConfigEntry) -> bool:
     """Set up Jablotron Futura from a config entry."""
-    futura = Futura(
-        hass, username=entry.data[CONF_USERNAME], password=entry.data[CONF_PASSWORD]
+    account = _async_get_account(hass, entry)
+    # TLS handshake and login overlap loading the stored snapshot
+    entry.async_create_background_task(
+        hass, account.futura.prewarm(), "jablotron_futura prewarm"
     )
-    coordinator = FuturaCoordinator(hass, futura)
-
-    await coordinator.async_config_entry_first_refresh()
+    coordinator = FuturaCoordinator(hass, entry, account)
+    account.coordinators.add(coordinator)
+    entry.async_on_unload(lambda: _async_release_account(hass, entry, coordinator))
+
+    # Start from the last stored snapshot so setup does not wait for the cloud
+    if not await coordinator.async_restore():
+        if CONF_SERVICE_ID in entry.data:
+            # Discovered by the config flow, go straight to getDevice.json
+            account.futura.seed(
+                entry.data[CONF_SERVICE_ID],
+                entry.data.get(CONF_SERVICE_TYPE, JABLOTRON_FUTURA_NAMESPACE),
+            )
+        await coordinator.async_config_entry_first_refresh()
+
+    _async_migrate_unique_ids(hass, entry, coordinator)
 
     entry.runtime_data = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    return True
+    if coordinator.stale:
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), "jablotron_futura first refresh"
+        )
 
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
-async def async_unload_entry(hass: HomeAssistant, entry: JablotronFuturaConfigEntry) -> bool:
-    """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    return True
 
 
-class FuturaCoordinator(DataUpdateCoordinator):
-    def __init__(self, hass: HomeAssistant, futura: Futura) -> None:
-        super().__init__(
-            hass,
-            _LOGGER,
-            name=DOMAIN,
-            update_interval=timedelta(minutes=5),
+async def async_update_options(
+    hass: HomeAssistant, entry: JablotronFuturaConfigEntry
+) -> None:
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+def _account_key(entry: JablotronFuturaConfigEntry) -> tuple[str, str]:
+    """Return the key of the account the entry talks to.
+
+    Entries of one account share a client only while they hold the same
+    password, an entry reauthenticated with a new one gets its own client.
+    """
+    return entry.data[CONF_USERNAME].lower(), entry.data[CONF_PASSWORD]
+
+
+@callback
+def _async_get_account(
+    hass: HomeAssistant, entry: JablotronFuturaConfigEntry
+) -> FuturaAccount:
+    """Return the account of the entry, creating its client if needed."""
+    accounts: dict[tuple[str, str], FuturaAccount] = hass.data.setdefault(DOMAIN, {})
+    key = _account_key(entry)
+    if (account := accounts.get(key)) is None:
+        account = accounts[key] = FuturaAccount(Futura.from_config(hass, entry.data))
+    return account
+
+
+@callback
+def _async_release_account(
+    hass: HomeAssistant,
+    entry: JablotronFuturaConfigEntry,
+    coordinator: FuturaCoordinator,
+) -> None:
+    """Drop the account client once its last config entry is unloaded."""
+    accounts: dict[tuple[str, str], FuturaAccount] = hass.data[DOMAIN]
+    key = _account_key(entry)
+    account = accounts[key]
+    account.coordinators.discard(coordinator)
+    if account.health_entry_id == entry.entry_id:
+        account.health_entry_id = None
+    if not account.coordinators:
+        del accounts[key]
+        hass.async_create_task(account.futura.close(), "jablotron_futura close")
+
+
+@callback
+def _async_migrate_unique_ids(
+    hass: HomeAssistant,
+    entry: JablotronFuturaConfigEntry,
+    coordinator: FuturaCoordinator,
+) -> None:
+    """Namespace bare unique ids from single-unit versions by serial number."""
+    central_units = coordinator.futura.central_units()
+    serial_nos = [
+        central_units[service_id].serial_no for service_id in coordinator.data
+    ]
+    prefixes = tuple("{}_".format(serial_no) for serial_no in serial_nos)
+    entity_registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(entity_registry, entry.entry_id):
+        if entity.unique_id.startswith(prefixes):
+            continue
+        # Earlier versions only ever set up the first Futura service
+        entity_registry.async_update_entity(
+            entity.entity_id,
+            new_unique_id="{}_{}".format(serial_nos[0], entity.unique_id),
         )
-        self.futura = futura
 
-    async def _async_update_data(self):
-        try:
-            return await self.futura.sync()
-        except ApiAuthError as err:
-            raise ConfigEntryAuthFailed(err) from err
+
+async def async_remove_entry(
+    hass: HomeAssistant, entry: JablotronFuturaConfigEntry
+) -> None:
+    """Remove the stored snapshot of a deleted config entry."""
+    await async_get_store(hass, entry).async_remove()
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: JablotronFuturaConfigEntry) -> bool:
+    """Unload a config entry."""
+    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
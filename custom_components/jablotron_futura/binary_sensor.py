@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+from typing import Any
 
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
@@ -11,7 +12,7 @@ from homeassistant.components.binary_sensor import (
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .__init__ import JablotronFuturaConfigEntry
+from .coordinator import JablotronFuturaConfigEntry
 from .futura import FuturaEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -41,7 +42,8 @@ async def async_setup_entry(
 
     async_add_entities(
         [
-            FuturaSummaryBinarySensorEntity(coordinator, description)
+            FuturaSummaryBinarySensorEntity(coordinator, service_id, description)
+            for service_id in coordinator.data
             for description in BINARY_SENSORS
         ]
     )
@@ -52,18 +54,27 @@ class FuturaSummaryBinarySensorEntity(FuturaEntity, BinarySensorEntity):
 
     entity_description: BinarySensorEntityDescription
 
-    def __init__(self, coordinator, description: BinarySensorEntityDescription) -> None:
-        super().__init__(coordinator)
+    def __init__(
+        self,
+        coordinator,
+        service_id: str,
+        description: BinarySensorEntityDescription,
+    ) -> None:
+        super().__init__(coordinator, service_id, description.key)
         self.entity_description = description
 
     @property
-    def unique_id(self) -> str:
-        return self.entity_description.key
+    def available(self) -> bool:
+        return (
+            super().available
+            and self.snapshot is not None
+            and self.is_on is not None
+        )
 
     @property
-    def available(self) -> bool:
-        return self.entity_description.key in self.coordinator.data["device"]["summary"]
+    def is_on(self) -> bool | None:
+        return getattr(self.snapshot.summary, self.entity_description.key)
 
     @property
-    def is_on(self) -> bool:
-        return self.coordinator.data["device"]["summary"][self.entity_description.key]
+    def _fingerprint(self) -> tuple[Any, ...]:
+        return (self.is_on,)
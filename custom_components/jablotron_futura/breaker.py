@@ -0,0 +1,52 @@
+"""Circuit breaker for the Jablotron cloud API."""
+from __future__ import annotations
+
+import time
+
+from .errors import ApiUnavailableError
+
+
+class CircuitBreaker:
+    """Stops calling a failing API until a cool-down passed
+
+    Opens for cooldown seconds after threshold consecutive failed requests,
+    or for as long as a Retry-After asked. Once open, each request that
+    fails again after the cool-down (half-open) reopens it for twice as
+    long, up to max_cooldown. A successful request closes it.
+    """
+
+    def __init__(self, threshold: int, cooldown: float, max_cooldown: float) -> None:
+        self._threshold = threshold
+        self._base_cooldown = cooldown
+        self._cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._failures = 0
+        self._open_until = 0.0
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until requests are let through again, 0 while closed"""
+        return max(self._open_until - time.monotonic(), 0.0)
+
+    def check(self) -> None:
+        """Raises ApiUnavailableError while the breaker is open"""
+        if (retry_after := self.retry_after) > 0:
+            raise ApiUnavailableError(
+                "Jablotron API unavailable, next request in {:.0f} s".format(
+                    retry_after
+                ),
+                retry_after=retry_after,
+            )
+
+    def success(self) -> None:
+        self._failures = 0
+        self._cooldown = self._base_cooldown
+
+    def failure(self, retry_after: float | None = None) -> None:
+        self._failures += 1
+        open_for = retry_after or 0.0
+        if self._failures >= self._threshold:
+            open_for = max(open_for, self._cooldown)
+            self._cooldown = min(self._cooldown * 2, self._max_cooldown)
+        if open_for:
+            self._open_until = max(self._open_until, time.monotonic() + open_for)
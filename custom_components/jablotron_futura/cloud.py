@@ -0,0 +1,431 @@
+"""Jablotron cloud API transport for Futura units"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+from http.cookies import SimpleCookie
+import logging
+import random
+import time
+from typing import Any
+
+import aiohttp
+
+from .breaker import CircuitBreaker
+from .const import (
+    JABLOTRON_API,
+    JABLOTRON_API_DEFAULT_HEADERS,
+    JABLOTRON_BREAKER_COOLDOWN,
+    JABLOTRON_BREAKER_MAX_COOLDOWN,
+    JABLOTRON_BREAKER_THRESHOLD,
+    JABLOTRON_CONNECT_TIMEOUT,
+    JABLOTRON_DNS_CACHE_TTL,
+    JABLOTRON_FUTURA_NAMESPACE,
+    JABLOTRON_FUTURA_NAMESPACE_KEY,
+    JABLOTRON_KEEPALIVE_TIMEOUT,
+    JABLOTRON_MAX_PARALLEL_REQUESTS,
+    JABLOTRON_REQUEST_TIMEOUT,
+    JABLOTRON_RETRY_ATTEMPTS,
+    JABLOTRON_RETRY_BACKOFF,
+    JABLOTRON_RETRY_MAX_DELAY,
+    JABLOTRON_RETRY_STATUSES,
+    JABLOTRON_SESSION_COOKIE,
+    JABLOTRON_SESSION_EARLY_EXPIRIES,
+    JABLOTRON_SESSION_LIFETIME,
+)
+from .errors import (
+    ApiAuthError,
+    ApiUnavailableError,
+    FuturaError,
+    InvalidPayloadError,
+    ServiceNotFoundError,
+)
+from .futura import (
+    FuturaCentralUnit,
+    FuturaService,
+    FuturaSnapshot,
+    FuturaTransport,
+)
+from .singleflight import SingleFlight
+from homeassistant import core
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util, ssl as ssl_util
+from homeassistant.util.json import json_loads
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def async_create_session() -> aiohttp.ClientSession:
+    """Creates an account's own session to the Jablotron API
+
+    Connections stay open between polls and host lookups are cached, unlike
+    on the shared Home Assistant session. The session cookie is passed with
+    each request, so no cookie jar is shared with other accounts.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            ssl=ssl_util.client_context(),
+            limit_per_host=JABLOTRON_MAX_PARALLEL_REQUESTS,
+            ttl_dns_cache=JABLOTRON_DNS_CACHE_TTL,
+            keepalive_timeout=JABLOTRON_KEEPALIVE_TIMEOUT,
+        ),
+        timeout=aiohttp.ClientTimeout(
+            total=JABLOTRON_REQUEST_TIMEOUT, connect=JABLOTRON_CONNECT_TIMEOUT
+        ),
+        cookie_jar=aiohttp.DummyCookieJar(),
+    )
+
+
+def _retry_after(headers: Mapping[str, str]) -> float | None:
+    """Seconds from a Retry-After header, given in seconds or as a date"""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - dt_util.utcnow()).total_seconds(), 0.0)
+
+
+class FuturaSession:
+    """Keeps the Jablotron API session token and its observed lifetime"""
+
+    def __init__(self, lifetime: float = JABLOTRON_SESSION_LIFETIME) -> None:
+        self.token: str | None = None
+        self.lifetime: float = lifetime
+        self.authorized_at: float | None = None
+        self._early_expiries = 0
+
+    @property
+    def valid(self) -> bool:
+        return (
+            self.authorized_at is not None
+            and time.monotonic() - self.authorized_at < self.lifetime
+        )
+
+    def start(self, cookies: SimpleCookie) -> None:
+        """Starts a new session from the userAuthorize.json response cookies"""
+        if self.authorized_at is not None:
+            # The previous session ran its lifetime without being rejected
+            self._early_expiries = 0
+        self.authorized_at = time.monotonic()
+        morsel = cookies.get(JABLOTRON_SESSION_COOKIE)
+        if morsel is None:
+            return
+        self.token = morsel.value
+        if morsel["max-age"]:
+            self.lifetime = float(morsel["max-age"])
+
+    def expire(self) -> None:
+        """Drops the session after the API rejected it"""
+        if self.authorized_at is not None:
+            self._early_expiries += 1
+            # The API keeps dropping sessions sooner than expected, renew the
+            # next ones before they run out. A single rejection, such as after
+            # an API restart, keeps the lifetime.
+            if self._early_expiries >= JABLOTRON_SESSION_EARLY_EXPIRIES:
+                elapsed = time.monotonic() - self.authorized_at
+                self.lifetime = max(min(self.lifetime, elapsed * 0.9), 60)
+        self.authorized_at = None
+        self.token = None
+
+    def cookies(self) -> dict[str, str] | None:
+        if self.token is None:
+            return None
+        return {JABLOTRON_SESSION_COOKIE: self.token}
+
+
+class FuturaCloudTransport(FuturaTransport):
+    """Reaches Futura units of a Jablotron account through api.jablonet.net"""
+
+    def __init__(self, hass: core.HomeAssistant, username: str, password: str) -> None:
+        super().__init__()
+        self._username: str = username
+        self._password: str = password
+        self._session = async_create_session()
+        # Entries stay loaded while Home Assistant stops, close the session then
+        self._unsub_close: core.CALLBACK_TYPE | None = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_CLOSE, self._async_close_on_stop
+        )
+        self._auth = FuturaSession()
+        self._authorizing: SingleFlight[None] = SingleFlight(
+            hass, "jablotron_futura authorize"
+        )
+        self._breaker = CircuitBreaker(
+            JABLOTRON_BREAKER_THRESHOLD,
+            JABLOTRON_BREAKER_COOLDOWN,
+            JABLOTRON_BREAKER_MAX_COOLDOWN,
+        )
+
+    async def prewarm(self) -> None:
+        """Signs in while the entry sets up, the first fetch joins the login"""
+        if self._auth.valid:
+            return
+        try:
+            await self.authorize()
+        except (FuturaError, UpdateFailed) as err:
+            # Raised again to the first refresh, which signs in itself
+            _LOGGER.debug("Jablotron sign-in ahead of the first refresh failed: %s", err)
+
+    async def close(self) -> None:
+        if self._unsub_close is not None:
+            self._unsub_close()
+            self._unsub_close = None
+        await self._session.close()
+
+    async def _async_close_on_stop(self, _event: core.Event) -> None:
+        self._unsub_close = None
+        await self._session.close()
+
+    async def authorize(self) -> None:
+        """Authorize user via API, concurrent callers share one login"""
+        await self._authorizing.join(self._authorize)
+
+    async def _authorize(self) -> None:
+        status, _, cookies = await self._send(
+            "userAuthorize.json",
+            {
+                "login": self._username,
+                "password": self._password,
+            },
+            JABLOTRON_API_DEFAULT_HEADERS,
+            retries=0,
+        )
+        if status in (401, 403):
+            raise ApiAuthError("Invalid Jablotron credentials")
+        if status != 200:
+            raise UpdateFailed(
+                f"Jablotron API authorization failed with status {status}"
+            )
+        self._auth.start(cookies)
+
+    async def _send(
+        self,
+        endpoint: str,
+        payload: dict[str, Any],
+        headers: dict[str, str],
+        retries: int = JABLOTRON_RETRY_ATTEMPTS,
+    ) -> tuple[int, dict[str, Any] | None, SimpleCookie]:
+        """Sends one request through the circuit breaker
+
+        Network errors, 429 and 5xx answers are retried up to retries times,
+        after the Retry-After the API asked for or a jittered exponential
+        backoff. Returns the status, the JSON of 200 answers and the cookies.
+        Each attempt is timed under the endpoint name without its extension.
+        """
+        metrics = self.metrics
+        phase = endpoint.removesuffix(".json")
+        attempt = 0
+        while True:
+            self._breaker.check()
+            retry_after = None
+            metrics.request()
+            try:
+                with metrics.time(phase):
+                    async with self._session.post(
+                        "{}/{}".format(JABLOTRON_API, endpoint),
+                        json=payload,
+                        headers=headers,
+                        cookies=self._auth.cookies(),
+                    ) as result:
+                        status = result.status
+                        body = await result.read()
+                metrics.count("response_bytes", len(body))
+                if status not in JABLOTRON_RETRY_STATUSES:
+                    self._breaker.success()
+                    json = None
+                    if status == 200:
+                        with metrics.time("json_decode"):
+                            try:
+                                json = json_loads(body)
+                            except ValueError as err:
+                                raise InvalidPayloadError(
+                                    f"Jablotron API {endpoint} returned invalid JSON"
+                                ) from err
+                    return status, json, result.cookies
+                retry_after = _retry_after(result.headers)
+                reason = f"status {status}"
+            except (TimeoutError, aiohttp.ClientError) as err:
+                reason = str(err) or type(err).__name__
+            metrics.count("failures")
+            if retry_after is not None:
+                delay = retry_after
+            else:
+                delay = JABLOTRON_RETRY_BACKOFF * 2**attempt * random.uniform(0.5, 1)
+            if attempt >= retries or delay > JABLOTRON_RETRY_MAX_DELAY:
+                self._breaker.failure(retry_after)
+                raise ApiUnavailableError(
+                    f"Jablotron API {endpoint} failed: {reason}",
+                    retry_after=self._breaker.retry_after or retry_after,
+                )
+            self._breaker.failure()
+            attempt += 1
+            metrics.count("retries")
+            _LOGGER.debug(
+                "Jablotron API %s failed (%s), retry %s in %.1f s",
+                endpoint,
+                reason,
+                attempt,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+    async def _post(
+        self,
+        endpoint: str,
+        payload: dict[str, Any],
+        namespaced: bool = False,
+        idempotent: bool = True,
+    ) -> dict[str, Any] | None:
+        """Calls data endpoint, authorizing only when the session is gone
+
+        Returns None when the API answers 304 Not Modified to a checksum.
+        Only idempotent requests are retried after transient failures.
+        """
+        if not self._auth.valid:
+            await self.authorize()
+        headers = JABLOTRON_API_DEFAULT_HEADERS
+        if namespaced:
+            headers = headers | {
+                JABLOTRON_FUTURA_NAMESPACE_KEY: JABLOTRON_FUTURA_NAMESPACE
+            }
+        retries = JABLOTRON_RETRY_ATTEMPTS if idempotent else 0
+        for retry in (True, False):
+            authorized_at = self._auth.authorized_at
+            status, json, _ = await self._send(endpoint, payload, headers, retries)
+            if status == 200:
+                return json
+            if status == 304:
+                return None
+            if status == 404:
+                raise ServiceNotFoundError(f"Jablotron API {endpoint} not found")
+            if status not in (401, 403):
+                raise UpdateFailed(
+                    f"Jablotron API {endpoint} failed with status {status}"
+                )
+            if not retry:
+                raise ApiAuthError("Jablotron API rejected the renewed session")
+            _LOGGER.debug("Jablotron session rejected by %s, re-authorizing", endpoint)
+            # Concurrent requests rejected with the same session renew it once
+            if self._auth.authorized_at == authorized_at:
+                self._auth.expire()
+            if not self._auth.valid:
+                await self.authorize()
+
+    async def discover(self) -> dict[str, FuturaService]:
+        """Resolves enabled Futura services via API"""
+        json = await self._post(
+            "serviceListGet.json",
+            {
+                "visibility": "DEFAULT",
+                "list-type": "EXTENDED",
+                "checksum": "",
+            },
+        )
+        _LOGGER.debug(json)
+        try:
+            services = {
+                str(service["service-id"]): FuturaService(
+                    service_id=str(service["service-id"]),
+                    service_type=service["service-type"].lower(),
+                    name=service.get("name"),
+                )
+                for service in json["data"]["services"]
+                if service["visible"]
+                and service["status"] == "ENABLED"
+                and service["service-type"].lower() == JABLOTRON_FUTURA_NAMESPACE
+            }
+        except (AttributeError, KeyError, TypeError) as err:
+            raise InvalidPayloadError(
+                f"Malformed Jablotron service list: {err}"
+            ) from err
+        if not services:
+            raise ServiceNotFoundError("No Futura service found")
+        return services
+
+    async def fetch(self, service: FuturaService) -> FuturaSnapshot:
+        json = await self._post(
+            "getDevice.json",
+            {
+                "id": service.service_id,
+                "status": "true",
+                "type": service.service_type,
+                "system": "IOS",
+                "checksum": service.checksum,
+            },
+            namespaced=True,
+        )
+        unchanged = json is None or "device" not in json
+        if unchanged and service.snapshot is not None:
+            # Nothing changed since the last checksum, hand out the same
+            # snapshot so the coordinator skips notifying entities.
+            return service.snapshot
+        try:
+            device = json["device"]
+            _LOGGER.debug(device)
+            with self.metrics.time("parse"):
+                snapshot = FuturaSnapshot.from_device(device)
+            room_ids = [room["id"] for room in device["rooms"]]
+            central_unit = FuturaCentralUnit(
+                service_id=device["id"],
+                model=device["type"],
+                hw_version=device["details"]["hw_revision"],
+                fw_version=device["details"]["fw_version"],
+                serial_no=device["details"]["serial_no"],
+                room_id=room_ids[0],
+            )
+        except (AttributeError, IndexError, KeyError, TypeError) as err:
+            raise InvalidPayloadError(
+                f"Malformed Futura device document: {err}"
+            ) from err
+        service.room_ids = room_ids
+        service.central_unit = central_unit
+        service.checksum = json.get("checksum", "")
+        return snapshot
+
+    async def write(
+        self,
+        service: FuturaService,
+        controls: dict[str, Any],
+        settings: dict[str, Any],
+    ) -> None:
+        if controls:
+            await self._post(
+                "setDevice.json",
+                {
+                    "device": {
+                        "type": JABLOTRON_FUTURA_NAMESPACE,
+                        "control": [
+                            {
+                                "manual": controls,
+                                "room_id": service.central_unit.room_id,
+                            }
+                        ],
+                        "id": service.central_unit.service_id,
+                    },
+                    "system": "IOS",
+                },
+                namespaced=True,
+                idempotent=False,
+            )
+        if settings:
+            await self._post(
+                "setDevice.json",
+                {
+                    "device": {
+                        "type": JABLOTRON_FUTURA_NAMESPACE,
+                        "settings": {"extended_properties": settings},
+                        "id": service.central_unit.service_id,
+                    },
+                    "system": "IOS",
+                },
+                namespaced=True,
+                idempotent=False,
+            )
@@ -1,18 +1,33 @@
 """Config flow for Jablotron Futura integration."""
 from __future__ import annotations
 
+from collections.abc import Mapping
 import logging
 from typing import Any
 
 import voluptuous as vol
 
+from .coordinator import default_scan_intervals, default_sensor_filters
 from .errors import ApiAuthError, ServiceNotFoundError
-from .futura import Futura
+from .futura import Futura, FuturaService
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import CONF_PASSWORD, CONF_USERNAME, DOMAIN
+from .const import (
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MAX_STATE_AGE,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_PASSWORD,
+    CONF_SERVICE_ID,
+    CONF_SERVICE_TYPE,
+    CONF_STALENESS_BUDGET,
+    CONF_USERNAME,
+    DEFAULT_NAME,
+    DEFAULT_SENSOR_FILTERS,
+    DEFAULT_STALENESS_BUDGET,
+    DOMAIN,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,20 +38,56 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+STEP_REAUTH_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_PASSWORD): str,
+    }
+)
+
+OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_MIN_SCAN_INTERVAL): vol.All(
+            vol.Coerce(int), vol.Range(min=10)
+        ),
+        vol.Required(CONF_MAX_SCAN_INTERVAL): vol.All(
+            vol.Coerce(int), vol.Range(min=60)
+        ),
+        vol.Required(CONF_STALENESS_BUDGET): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+    }
+)
+
+SENSOR_OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_MAX_STATE_AGE): vol.All(vol.Coerce(int), vol.Range(min=60)),
+        **{
+            vol.Required("{}_{}".format(key, option)): validator
+            for key in DEFAULT_SENSOR_FILTERS
+            for option, validator in (
+                ("deadband", vol.All(vol.Coerce(float), vol.Range(min=0))),
+                ("precision", vol.All(vol.Coerce(int), vol.Range(min=0, max=3))),
+            )
+        },
+    }
+)
+
 
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
+    Only authorizes and discovers the services; the device itself is fetched by
+    the first refresh of the config entry.
     """
-    futura = Futura(hass, data[CONF_USERNAME], data[CONF_PASSWORD])
-    await futura.sync()
-    central_unit = futura.central_unit()
-    if not central_unit:
-        raise ServiceNotFoundError
+    futura = Futura.from_config(hass, data)
+    try:
+        services = await futura.discover()
+    finally:
+        await futura.close()
 
     # Return info that you want to store in the config entry.
-    return {"title": central_unit.model}
+    return {"services": services}
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -44,6 +95,19 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        self._data: dict[str, Any] = {}
+        self._services: dict[str, FuturaService] = {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return OptionsFlow()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -67,8 +131,149 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             _LOGGER.exception(ex)
             errors["base"] = "unknown"
         else:
-            return self.async_create_entry(title=info["title"], data=user_input)
+            self._data = user_input
+            self._services = info["services"]
+            if len(self._services) == 1:
+                return await self.async_step_unit(
+                    {CONF_SERVICE_ID: next(iter(self._services))}
+                )
+            return await self.async_step_unit()
 
         return self.async_show_form(
             step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
         )
+
+    async def async_step_unit(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Pick the Futura unit when the account has more than one."""
+        if user_input is None:
+            return self.async_show_form(
+                step_id="unit",
+                data_schema=vol.Schema(
+                    {
+                        vol.Required(CONF_SERVICE_ID): vol.In(
+                            {
+                                service_id: "{} ({})".format(
+                                    service.name or DEFAULT_NAME, service_id
+                                )
+                                for service_id, service in self._services.items()
+                            }
+                        )
+                    }
+                ),
+            )
+
+        service = self._services[user_input[CONF_SERVICE_ID]]
+        await self.async_set_unique_id(service.service_id)
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(
+            title=service.name or DEFAULT_NAME,
+            data=self._data
+            | {
+                CONF_SERVICE_ID: service.service_id,
+                CONF_SERVICE_TYPE: service.service_type,
+            },
+        )
+
+    async def async_step_reauth(self, entry_data: Mapping[str, Any]) -> FlowResult:
+        """Handle rejected credentials."""
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Ask for the new password."""
+        errors = {}
+        entry = self._get_reauth_entry()
+
+        if user_input is not None:
+            data = entry.data | user_input
+            try:
+                info = await validate_input(self.hass, data)
+            except ApiAuthError as ex:
+                _LOGGER.exception(ex)
+                errors["base"] = "invalid_auth"
+            except ServiceNotFoundError as ex:
+                _LOGGER.exception(ex)
+                errors["base"] = "service_not_found"
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOGGER.exception(ex)
+                errors["base"] = "unknown"
+            else:
+                service_id = data.get(CONF_SERVICE_ID)
+                if service_id is not None and service_id not in info["services"]:
+                    errors["base"] = "service_not_found"
+                else:
+                    self._async_update_account_entries(entry, data)
+                    return self.async_update_reload_and_abort(entry, data=data)
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=STEP_REAUTH_DATA_SCHEMA,
+            description_placeholders={CONF_USERNAME: entry.data[CONF_USERNAME]},
+            errors=errors,
+        )
+
+    @callback
+    def _async_update_account_entries(
+        self, entry: config_entries.ConfigEntry, data: Mapping[str, Any]
+    ) -> None:
+        """Store the new password in the other entries of the account too."""
+        username = data[CONF_USERNAME].lower()
+        for other in self.hass.config_entries.async_entries(DOMAIN):
+            if (
+                other.entry_id == entry.entry_id
+                or other.data[CONF_USERNAME].lower() != username
+            ):
+                continue
+            self.hass.config_entries.async_update_entry(
+                other, data=other.data | {CONF_PASSWORD: data[CONF_PASSWORD]}
+            )
+            self.hass.config_entries.async_schedule_reload(other.entry_id)
+
+
+class OptionsFlow(config_entries.OptionsFlow):
+    """Handle Jablotron Futura options."""
+
+    _options: dict[str, Any]
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage polling intervals and the staleness budget."""
+        errors = {}
+
+        if user_input is not None:
+            if user_input[CONF_MIN_SCAN_INTERVAL] > user_input[CONF_MAX_SCAN_INTERVAL]:
+                errors["base"] = "invalid_scan_interval"
+            else:
+                self._options = user_input
+                return await self.async_step_sensors()
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                OPTIONS_SCHEMA,
+                user_input
+                or default_scan_intervals()
+                | {CONF_STALENESS_BUDGET: DEFAULT_STALENESS_BUDGET}
+                | self.config_entry.options,
+            ),
+            errors=errors,
+        )
+
+    async def async_step_sensors(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage sensor deadbands, precision and the max state age."""
+        if user_input is not None:
+            return self.async_create_entry(data=self._options | user_input)
+
+        return self.async_show_form(
+            step_id="sensors",
+            data_schema=self.add_suggested_values_to_schema(
+                SENSOR_OPTIONS_SCHEMA,
+                default_sensor_filters() | self.config_entry.options,
+            ),
+        )
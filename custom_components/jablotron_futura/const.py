@@ -10,8 +10,63 @@ JABLOTRON_API_DEFAULT_HEADERS = {
     "Content-Type": "application/json",
     "Accept-Language": "en",
     "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
 }
 CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
 JABLOTRON_FUTURA_NAMESPACE_KEY = "x-client-namespace"
 JABLOTRON_FUTURA_NAMESPACE = "futura2"
+JABLOTRON_SESSION_COOKIE = "PHPSESSID"
+JABLOTRON_SESSION_LIFETIME = 20 * 60
+# Sessions in a row the API drops early before the lifetime is shortened
+JABLOTRON_SESSION_EARLY_EXPIRIES = 2
+JABLOTRON_WRITE_COALESCE_DELAY = 0.3
+REQUEST_REFRESH_DELAY = 2
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+DEFAULT_MIN_SCAN_INTERVAL = 60
+DEFAULT_MAX_SCAN_INTERVAL = 600
+JABLOTRON_MAX_PARALLEL_REQUESTS = 4
+CONF_SERVICE_ID = "service_id"
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 60
+CONF_SERVICE_TYPE = "service_type"
+DEFAULT_NAME = "Jablotron Futura"
+CONF_MAX_STATE_AGE = "max_state_age"
+DEFAULT_MAX_STATE_AGE = 60 * 60
+# Sensor key: (deadband, precision) used until set in the options under
+# "<key>_deadband" and "<key>_precision"
+DEFAULT_SENSOR_FILTERS = {
+    "filter_health": (1, 0),
+    "device_consumption": (1, 1),
+    "heating_recovered_current": (5, 1),
+    "fut_co2_ppm_max": (10, 1),
+    "fut_humi_indoor": (0.5, 1),
+    "fut_temp_indoor": (0.1, 1),
+    "fut_temp_outdoor": (0.1, 1),
+}
+# Retries of idempotent API reads after network errors, 429 and 5xx answers
+JABLOTRON_RETRY_ATTEMPTS = 2
+JABLOTRON_RETRY_BACKOFF = 1
+# Retry-After longer than this fails the refresh instead of waiting in it
+JABLOTRON_RETRY_MAX_DELAY = 30
+JABLOTRON_RETRY_STATUSES = (429, 500, 502, 503, 504)
+JABLOTRON_BREAKER_THRESHOLD = 5
+JABLOTRON_BREAKER_COOLDOWN = 60
+JABLOTRON_BREAKER_MAX_COOLDOWN = 30 * 60
+CONF_STALENESS_BUDGET = "staleness_budget"
+# Minutes entities keep the last snapshot while refreshes fail
+DEFAULT_STALENESS_BUDGET = 30
+# Seconds for a whole API request and for opening its connection
+JABLOTRON_REQUEST_TIMEOUT = 30
+JABLOTRON_CONNECT_TIMEOUT = 10
+# Idle API connections are kept open across polls up to this many seconds
+JABLOTRON_KEEPALIVE_TIMEOUT = 5 * 60
+JABLOTRON_DNS_CACHE_TTL = 10 * 60
+# Latency samples kept per phase for the diagnostics percentiles
+METRICS_WINDOW = 100
+SERVICE_PROFILE = "profile"
+ATTR_REFRESHES = "refreshes"
+ATTR_TOP = "top"
+DEFAULT_PROFILE_REFRESHES = 3
+DEFAULT_PROFILE_TOP = 30
@@ -0,0 +1,331 @@
+"""Data update coordinator for the Jablotron Futura integration."""
+
+from __future__ import annotations
+
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, field, replace
+from functools import partial
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MAX_STATE_AGE,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_SERVICE_ID,
+    CONF_STALENESS_BUDGET,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MAX_STATE_AGE,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_SENSOR_FILTERS,
+    DEFAULT_STALENESS_BUDGET,
+    DOMAIN,
+    REQUEST_REFRESH_DELAY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+from .errors import (
+    ApiAuthError,
+    ApiUnavailableError,
+    InvalidPayloadError,
+    ServiceNotFoundError,
+)
+from .futura import Futura, FuturaSnapshot
+from .scheduler import FuturaPollScheduler
+from .singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from .profiler import RefreshProfiler
+
+type JablotronFuturaConfigEntry = ConfigEntry[FuturaCoordinator]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class FuturaAccount:
+    """Futura client shared by all config entries of one Jablotron account."""
+
+    futura: Futura
+    coordinators: set[FuturaCoordinator] = field(default_factory=set)
+    # Entry holding the API health sensors of the account's client
+    health_entry_id: str | None = None
+
+
+def async_get_store(
+    hass: HomeAssistant, entry: JablotronFuturaConfigEntry
+) -> Store[dict[str, Any]]:
+    """Return the store holding the entry's last snapshots."""
+    return Store(hass, STORAGE_VERSION, "{}.{}".format(DOMAIN, entry.entry_id))
+
+
+def default_scan_intervals() -> dict[str, int]:
+    """Return the polling bounds used until they are set in the options."""
+    return {
+        CONF_MIN_SCAN_INTERVAL: DEFAULT_MIN_SCAN_INTERVAL,
+        CONF_MAX_SCAN_INTERVAL: DEFAULT_MAX_SCAN_INTERVAL,
+    }
+
+
+def default_sensor_filters() -> dict[str, float | int]:
+    """Return the sensor deadbands and precisions used until set in the options."""
+    defaults: dict[str, float | int] = {CONF_MAX_STATE_AGE: DEFAULT_MAX_STATE_AGE}
+    for key, (deadband, precision) in DEFAULT_SENSOR_FILTERS.items():
+        defaults["{}_deadband".format(key)] = deadband
+        defaults["{}_precision".format(key)] = precision
+    return defaults
+
+
+class FuturaCoordinator(DataUpdateCoordinator[dict[str, FuturaSnapshot]]):
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: JablotronFuturaConfigEntry,
+        account: FuturaAccount,
+    ) -> None:
+        scan_intervals = default_scan_intervals() | entry.options
+        self.scheduler = FuturaPollScheduler(
+            min_interval=timedelta(seconds=scan_intervals[CONF_MIN_SCAN_INTERVAL]),
+            max_interval=timedelta(seconds=scan_intervals[CONF_MAX_SCAN_INTERVAL]),
+        )
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=entry,
+            name=DOMAIN,
+            update_interval=self.scheduler.interval,
+            # Futura.sync() returns the same snapshot when the device checksum
+            # is unchanged, so entities are only notified about real changes.
+            always_update=False,
+        )
+        self.account = account
+        self.futura = account.futura
+        # Entries created before units could be picked cover every unit
+        self.service_id: str | None = entry.data.get(CONF_SERVICE_ID)
+        # Set while entities show data restored from storage
+        self.stale = False
+        # Last successful refresh, and the first failed one since then
+        self.last_updated_from_cloud: datetime | None = None
+        self.failing_since: datetime | None = None
+        self.consecutive_failures = 0
+        self._staleness_budget = timedelta(
+            minutes=entry.options.get(CONF_STALENESS_BUDGET, DEFAULT_STALENESS_BUDGET)
+        )
+        self._expiry_unsub: CALLBACK_TYPE | None = None
+        self._expiry_job = HassJob(self._async_expire, "futura staleness budget")
+        self._store = async_get_store(hass, entry)
+        self._force_notify = False
+        self._read_back_unsub: CALLBACK_TYPE | None = None
+        self._read_back_job = HassJob(self._async_read_back, "futura read-back")
+        self._refreshing: SingleFlight[None] = SingleFlight(
+            hass, "jablotron_futura refresh"
+        )
+        # Entity state writes of the last update, see FuturaEntity fingerprints
+        self.writes_emitted = 0
+        self.writes_skipped = 0
+        # Set by the profile service until its refreshes are done
+        self.profiler: RefreshProfiler | None = None
+
+    @callback
+    def async_schedule_read_back(self) -> None:
+        """Schedules refresh confirming optimistic entity state after a write
+
+        Each write pushes the read-back further out, so a burst of writes
+        (an automation, a dragged slider) is confirmed by a single refresh.
+        """
+        self._force_notify = True
+        self.scheduler.poll_fast()
+        if self._read_back_unsub is not None:
+            self._read_back_unsub()
+        self._read_back_unsub = async_call_later(
+            self.hass, REQUEST_REFRESH_DELAY, self._read_back_job
+        )
+
+    @callback
+    def async_update_listeners(self) -> None:
+        self.writes_emitted = 0
+        self.writes_skipped = 0
+        with self.futura.metrics.time("fan_out"), self._profiling():
+            super().async_update_listeners()
+        _LOGGER.debug(
+            "Futura update wrote %s entity states, skipped %s unchanged",
+            self.writes_emitted,
+            self.writes_skipped,
+        )
+
+    @property
+    def expired(self) -> bool:
+        """Whether refreshes kept failing for longer than the staleness budget"""
+        return (
+            self.failing_since is not None
+            and dt_util.utcnow() - self.failing_since >= self._staleness_budget
+        )
+
+    @callback
+    def _async_succeeded(self) -> None:
+        self.last_updated_from_cloud = dt_util.utcnow()
+        self.failing_since = None
+        self.consecutive_failures = 0
+        if self._expiry_unsub is not None:
+            self._expiry_unsub()
+            self._expiry_unsub = None
+
+    @callback
+    def _async_failed(self, retry_after: float | None = None) -> None:
+        self.futura.metrics.count("refresh_failures")
+        self.consecutive_failures += 1
+        self.update_interval = self.scheduler.failure(retry_after)
+        if self.failing_since is not None:
+            return
+        self.failing_since = dt_util.utcnow()
+        # Consecutive failures do not notify entities, so tell them once the
+        # budget ran out, whenever the next poll is due
+        self._expiry_unsub = async_call_later(
+            self.hass, self._staleness_budget, self._expiry_job
+        )
+
+    @callback
+    def _async_expire(self, _now) -> None:
+        self._expiry_unsub = None
+        self.async_update_listeners()
+
+    async def async_refresh(self) -> None:
+        """Refreshes data, requests made meanwhile fold into one trailing refresh"""
+        await self._refreshing.follow(super().async_refresh)
+
+    async def _handle_refresh_interval(self, _now: datetime | None = None) -> None:
+        """Polls when due, sharing a refresh that is already running
+
+        Home Assistant runs scheduled polls through _async_refresh, past
+        async_refresh, so without this a poll due during a read-back would
+        sync and update the entities a second time right after it.
+        """
+        await self._refreshing.join(partial(super()._handle_refresh_interval, _now))
+
+    async def async_restore(self) -> bool:
+        """Restores snapshots stored by an earlier run, returns if there were any"""
+        if (stored := await self._store.async_load()) is None:
+            return False
+        try:
+            self.data = self._own(self.futura.restore(stored["units"]))
+        except (InvalidPayloadError, KeyError, UpdateFailed) as err:
+            _LOGGER.debug("Ignoring stored Futura snapshot: %s", err)
+            return False
+        if (updated_at := stored.get("updated_at")) is not None:
+            self.last_updated_from_cloud = dt_util.parse_datetime(updated_at)
+        self.stale = True
+        self._force_notify = True
+        return True
+
+    @callback
+    def _async_save(self) -> None:
+        self._store.async_delay_save(
+            lambda: {
+                "units": self.futura.dump(list(self.data)),
+                "updated_at": self.last_updated_from_cloud.isoformat(),
+            },
+            STORAGE_SAVE_DELAY,
+        )
+
+    async def _async_read_back(self, _now) -> None:
+        self._read_back_unsub = None
+        await self.async_refresh()
+
+    async def async_shutdown(self) -> None:
+        if self._read_back_unsub is not None:
+            self._read_back_unsub()
+            self._read_back_unsub = None
+        if self._expiry_unsub is not None:
+            self._expiry_unsub()
+            self._expiry_unsub = None
+        await super().async_shutdown()
+
+    def _profiling(self) -> AbstractContextManager[None]:
+        """Runs the block under the profile service's profiler, if any"""
+        if self.profiler is not None and self.profiler.done:
+            self.profiler = None
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.capture()
+
+    async def _async_update_data(self) -> dict[str, FuturaSnapshot]:
+        try:
+            with self._profiling():
+                return await self._async_sync()
+        finally:
+            if self.profiler is not None:
+                self.profiler.refreshed()
+
+    async def _async_sync(self) -> dict[str, FuturaSnapshot]:
+        try:
+            snapshots = self._own(await self.futura.sync())
+        except ApiAuthError as err:
+            self._async_failed()
+            raise ConfigEntryAuthFailed(err) from err
+        except ApiUnavailableError as err:
+            # Stretched while the API rate limits or the circuit is open
+            self._async_failed(err.retry_after)
+            raise UpdateFailed(err) from err
+        except (InvalidPayloadError, ServiceNotFoundError) as err:
+            self._async_failed()
+            raise UpdateFailed(err) from err
+        except UpdateFailed:
+            self._async_failed()
+            raise
+        except Exception:
+            # Logged as unexpected by the coordinator, still starts the budget
+            self._async_failed()
+            raise
+        self.update_interval = self.scheduler.success(snapshots)
+        self._async_succeeded()
+        if snapshots != self.data:
+            self._async_save()
+        elif self._force_notify:
+            # Entities hold optimistic or restored state until they are
+            # notified, so hand out new objects even if nothing changed.
+            snapshots = {
+                service_id: replace(snapshot)
+                for service_id, snapshot in snapshots.items()
+            }
+        self._force_notify = False
+        self.stale = False
+        self._async_fan_out()
+        return snapshots
+
+    def _own(self, snapshots: dict[str, FuturaSnapshot]) -> dict[str, FuturaSnapshot]:
+        if self.service_id is None:
+            return snapshots
+        if self.service_id not in snapshots:
+            raise UpdateFailed(f"Futura service {self.service_id} not found")
+        return {self.service_id: snapshots[self.service_id]}
+
+    @callback
+    def _async_fan_out(self) -> None:
+        """Hands the account's fresh snapshots to the other entries' coordinators
+
+        Futura.sync() fetched every unit of the account, so entries sharing it
+        are updated (and their next poll pushed out) without another request.
+        """
+        snapshots = self.futura.snapshots()
+        for coordinator in self.account.coordinators:
+            if coordinator is self or coordinator.data is None:
+                continue
+            try:
+                own = coordinator._own(snapshots)
+            except UpdateFailed:
+                continue
+            recovered = not coordinator.last_update_success
+            coordinator._async_succeeded()
+            if own != coordinator.data or coordinator.stale or recovered:
+                coordinator.stale = False
+                coordinator.async_set_updated_data(own)
+                coordinator._async_save()
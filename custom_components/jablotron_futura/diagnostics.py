@@ -0,0 +1,54 @@
+"""Diagnostics support for the Jablotron Futura integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_PASSWORD, CONF_USERNAME
+from .coordinator import JablotronFuturaConfigEntry
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, "serial_no"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: JablotronFuturaConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data
+    futura = coordinator.futura
+    central_units = futura.central_units()
+
+    def isoformat(value) -> str | None:
+        return None if value is None else value.isoformat()
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "stale": coordinator.stale,
+            "expired": coordinator.expired,
+            "last_updated_from_cloud": isoformat(coordinator.last_updated_from_cloud),
+            "failing_since": isoformat(coordinator.failing_since),
+            "consecutive_failures": coordinator.consecutive_failures,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "writes_emitted": coordinator.writes_emitted,
+            "writes_skipped": coordinator.writes_skipped,
+        },
+        "metrics": futura.metrics.as_dict(),
+        "units": [
+            async_redact_data(
+                {
+                    "central_unit": vars(central_units[service_id]),
+                    "device": snapshot.as_device(),
+                },
+                TO_REDACT,
+            )
+            for service_id, snapshot in (coordinator.data or {}).items()
+        ],
+    }
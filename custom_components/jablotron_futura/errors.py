@@ -12,3 +12,16 @@ class ApiAuthError(FuturaError):
 
 class ServiceNotFoundError(FuturaError):
     """Service is not available."""
+
+
+class InvalidPayloadError(FuturaError):
+    """API returned a malformed document."""
+
+
+class ApiUnavailableError(FuturaError):
+    """API is unreachable, rate limiting or failing."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        # Seconds the API asked for or the circuit breaker stays open
+        self.retry_after = retry_after
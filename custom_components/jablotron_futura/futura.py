@@ -1,24 +1,29 @@
 """Futura class definitions"""
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
+import asyncio
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass
 import logging
+from types import MappingProxyType
 from typing import Any
 
-import aiohttp
-
 from .const import (
+    CONF_PASSWORD,
+    CONF_USERNAME,
     DOMAIN,
     JABLOTRON,
-    JABLOTRON_API,
-    JABLOTRON_API_DEFAULT_HEADERS,
-    JABLOTRON_FUTURA_NAMESPACE,
-    JABLOTRON_FUTURA_NAMESPACE_KEY,
+    JABLOTRON_MAX_PARALLEL_REQUESTS,
+    JABLOTRON_WRITE_COALESCE_DELAY,
 )
-from .errors import ApiAuthError
+from .errors import ApiAuthError, InvalidPayloadError, ServiceNotFoundError
+from .metrics import FuturaMetrics
+from .singleflight import SingleFlight
 from homeassistant import core
-from homeassistant.helpers import aiohttp_client
+from homeassistant.core import callback
 from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.helpers.update_coordinator import CoordinatorEntity, UpdateFailed
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -43,148 +48,509 @@ class FuturaCentralUnit:
         self.room_id: str = room_id
 
 
+@dataclass(frozen=True, slots=True)
+class FuturaSummary:
+    """Futura unit summary values used by the integration"""
+
+    filter_health: float | None
+    filter_health_units: str | None
+    device_consumption: float | None
+    device_consumption_units: str | None
+    heating_recovered_current: float | None
+    heating_recovered_current_units: str | None
+    current_servo_drying: bool | None
+    current_servo_bypass: bool | None
+    airflow: tuple[float, ...]
+    airflow_units: str | None
+
+    @classmethod
+    def from_dict(cls, summary: dict[str, Any]) -> FuturaSummary:
+        return cls(
+            filter_health=summary.get("filter_health"),
+            filter_health_units=summary.get("filter_health_units"),
+            device_consumption=summary.get("device_consumption"),
+            device_consumption_units=summary.get("device_consumption_units"),
+            heating_recovered_current=summary.get("heating_recovered_current"),
+            heating_recovered_current_units=summary.get(
+                "heating_recovered_current_units"
+            ),
+            current_servo_drying=summary.get("current_servo_drying"),
+            current_servo_bypass=summary.get("current_servo_bypass"),
+            airflow=tuple(summary.get("airflow", ())),
+            airflow_units=summary.get("airflow_units"),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass(frozen=True, slots=True)
+class FuturaPeriphery:
+    """Futura periphery (sensor) reading"""
+
+    id: str
+    value: float | None
+    units: str | None
+
+    @classmethod
+    def from_dict(cls, periphery: dict[str, Any]) -> FuturaPeriphery:
+        properties = periphery["extended_properties"]
+        return cls(
+            id=periphery["id"],
+            value=properties.get("value"),
+            units=properties.get("units"),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "extended_properties": {"value": self.value, "units": self.units},
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class FuturaControlOption:
+    """Option of a Futura enumerated control"""
+
+    id: str
+    title: str
+
+
+@dataclass(frozen=True, slots=True)
+class FuturaControl:
+    """Futura control with its current value and limits"""
+
+    id: str
+    value: Any
+    min: float | None
+    max: float | None
+    step: float | None
+    units: str | None
+    options: tuple[FuturaControlOption, ...]
+
+    @classmethod
+    def from_dict(cls, control: dict[str, Any]) -> FuturaControl:
+        properties = control["extended_properties"]
+        return cls(
+            id=control["id"],
+            value=properties.get("value"),
+            min=properties.get("min"),
+            max=properties.get("max"),
+            step=properties.get("step"),
+            units=properties.get("units"),
+            options=tuple(
+                FuturaControlOption(id=option["id"], title=option["title"])
+                for option in properties.get("options", ())
+            ),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "extended_properties": {
+                "value": self.value,
+                "min": self.min,
+                "max": self.max,
+                "step": self.step,
+                "units": self.units,
+                "options": [asdict(option) for option in self.options],
+            },
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class FuturaSettings:
+    """Futura settings extended properties"""
+
+    bypass: str | None
+    cooling: str | None
+    heating: str | None
+    radon_protection: str | None
+
+    @classmethod
+    def from_dict(cls, settings: dict[str, Any]) -> FuturaSettings:
+        properties = settings.get("extended_properties", {})
+        return cls(
+            bypass=properties.get("bypass"),
+            cooling=properties.get("cooling"),
+            heating=properties.get("heating"),
+            radon_protection=properties.get("radon_protection"),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"extended_properties": asdict(self)}
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class FuturaSnapshot:
+    """Parsed getDevice.json document, built once per refresh
+
+    Compared by identity, so the coordinator notifies entities whenever a new
+    snapshot is built and skips them when the previous one is handed out.
+    """
+
+    summary: FuturaSummary
+    settings: FuturaSettings
+    controls: Mapping[str, FuturaControl]
+    peripheries: Mapping[str, FuturaPeriphery]
+
+    @classmethod
+    def from_device(cls, device: dict[str, Any]) -> FuturaSnapshot:
+        """Parses device document, rejecting malformed payloads"""
+        try:
+            return cls(
+                summary=FuturaSummary.from_dict(device["summary"]),
+                settings=FuturaSettings.from_dict(device.get("settings", {})),
+                controls=MappingProxyType(
+                    {
+                        control["id"]: FuturaControl.from_dict(control)
+                        for control in device["data"]["controls"]
+                    }
+                ),
+                peripheries=MappingProxyType(
+                    {
+                        periphery["id"]: FuturaPeriphery.from_dict(periphery)
+                        for periphery in device["peripheries"]
+                    }
+                ),
+            )
+        except (AttributeError, KeyError, TypeError) as err:
+            raise InvalidPayloadError(
+                f"Malformed Futura device document: {err}"
+            ) from err
+
+    def as_device(self) -> dict[str, Any]:
+        """Returns snapshot in the getDevice.json document shape"""
+        return {
+            "summary": self.summary.as_dict(),
+            "settings": self.settings.as_dict(),
+            "data": {
+                "controls": [control.as_dict() for control in self.controls.values()]
+            },
+            "peripheries": [
+                periphery.as_dict() for periphery in self.peripheries.values()
+            ],
+        }
+
+
+class FuturaService:
+    """Represents Futura service resolved from the service list"""
+
+    def __init__(
+        self, service_id: str, service_type: str, name: str | None = None
+    ) -> None:
+        self.service_id: str = service_id
+        self.service_type: str = service_type
+        self.name: str | None = name
+        self.room_ids: list[str] = []
+        self.checksum: str = ""
+        self.snapshot: FuturaSnapshot | None = None
+        self.central_unit: FuturaCentralUnit | None = None
+        self.pending_controls: dict[str, Any] = {}
+        self.pending_settings: dict[str, Any] = {}
+
+
+class FuturaTransport(ABC):
+    """Way of reaching Futura units, such as the Jablotron cloud API"""
+
+    def __init__(self) -> None:
+        self.metrics = FuturaMetrics()
+
+    @abstractmethod
+    async def discover(self) -> dict[str, FuturaService]:
+        """Resolves the Futura units reachable through the transport"""
+
+    @abstractmethod
+    async def fetch(self, service: FuturaService) -> FuturaSnapshot:
+        """Reads unit, returns service.snapshot itself when nothing changed"""
+
+    @abstractmethod
+    async def write(
+        self,
+        service: FuturaService,
+        controls: dict[str, Any],
+        settings: dict[str, Any],
+    ) -> None:
+        """Sends control and settings changes to the unit"""
+
+    async def prewarm(self) -> None:
+        """Opens the connection ahead of the first fetch"""
+
+    async def close(self) -> None:
+        """Releases connections held by the transport"""
+
+
 class Futura:
-    def __init__(self, hass: core.HomeAssistant, username: str, password: str) -> None:
+    def __init__(self, hass: core.HomeAssistant, transport: FuturaTransport) -> None:
         self._hass: core.HomeAssistant = hass
-        self._username: str = username
-        self._password: str = password
-        self._central_unit: FuturaCentralUnit | None = None
-        self._session = aiohttp_client.async_get_clientsession(self._hass)
+        self.transport: FuturaTransport = transport
+        # Shared with the transport, which times and counts its requests
+        self.metrics: FuturaMetrics = transport.metrics
+        self._services: dict[str, FuturaService] = {}
+        self._semaphore = asyncio.Semaphore(JABLOTRON_MAX_PARALLEL_REQUESTS)
+        self._flush: asyncio.Task[None] | None = None
+        self._syncing: SingleFlight[dict[str, FuturaSnapshot]] = SingleFlight(
+            hass, "jablotron_futura sync"
+        )
+        # Writes sent so far, and how many of them were sent before the
+        # running and the last successful sync started. A sync started before
+        # a write is not shared with callers reading the write back.
+        self.writes = 0
+        self.synced_writes = 0
+        self._sync_writes = 0
 
-    async def authorize(self) -> None:
-        """Authorize user via API"""
-        try:
-            async with self._session.post(
-                "{}/userAuthorize.json".format(JABLOTRON_API),
-                json={
-                    "login": self._username,
-                    "password": self._password,
-                },
-                headers=JABLOTRON_API_DEFAULT_HEADERS,
-            ) as result:
-                if result.status in (401, 403):
-                    raise ApiAuthError("Invalid Jablotron credentials")
-                if result.status != 200:
-                    raise UpdateFailed(
-                        f"Jablotron API authorization failed with status {result.status}"
-                    )
-        except (TimeoutError, aiohttp.ClientError) as err:
-            raise UpdateFailed(f"Error communicating with Jablotron API: {err}") from err
-
-    async def sync(self):
-        """Get data from API"""
-        await self.authorize()
+    @classmethod
+    def from_config(cls, hass: core.HomeAssistant, data: Mapping[str, Any]) -> Futura:
+        """Creates client for config entry data"""
+        from .cloud import FuturaCloudTransport
+
+        return cls(
+            hass,
+            FuturaCloudTransport(hass, data[CONF_USERNAME], data[CONF_PASSWORD]),
+        )
+
+    async def discover(self) -> dict[str, FuturaService]:
+        """Resolves Futura services through the transport"""
+        self._services = await self.transport.discover()
+        return self._services
+
+    def seed(self, service_id: str, service_type: str) -> None:
+        """Registers service known from config entry so sync() skips discovery"""
+        if service_id not in self._services:
+            self._services[service_id] = FuturaService(service_id, service_type)
+
+    async def sync(self) -> dict[str, FuturaSnapshot]:
+        """Get data of all Futura units from API, concurrent callers share one fetch"""
+        if self._sync_writes < self.writes:
+            return await self._syncing.follow(self._sync)
+        return await self._syncing.join(self._sync)
+
+    async def _sync(self) -> dict[str, FuturaSnapshot]:
+        writes = self._sync_writes = self.writes
+        metrics = self.metrics
+        received = metrics.counters["response_bytes"]
+        with metrics.time("sync"):
+            snapshots = await self._sync_services()
+        self.synced_writes = max(self.synced_writes, writes)
+        # The sync phase also times failed syncs
+        metrics.sync_seconds = metrics.phases["sync"].last
+        metrics.sync_bytes = metrics.counters["response_bytes"] - received
+        return snapshots
+
+    async def _sync_services(self) -> dict[str, FuturaSnapshot]:
+        if not self._services:
+            await self.discover()
+            return await self._get_devices()
         try:
-            async with self._session.post(
-                "{}/serviceListGet.json".format(JABLOTRON_API),
-                json={
-                    "visibility": "DEFAULT",
-                    "list-type": "EXTENDED",
-                    "checksum": "",
-                },
-                headers=JABLOTRON_API_DEFAULT_HEADERS,
-            ) as result:
-                if result.status != 200:
-                    raise UpdateFailed(
-                        f"Failed to get service list: status {result.status}"
-                    )
-                json = await result.json()
-                _LOGGER.debug(json)
-                data = json["data"]
-                futura_services = [
-                    service
-                    for service in data["services"]
-                    if service["visible"]
-                    and service["status"] == "ENABLED"
-                    and service["service-type"].lower() == JABLOTRON_FUTURA_NAMESPACE
-                ]
-                if not futura_services:
-                    raise UpdateFailed("No Futura service found")
-                service = futura_services[0]
-            async with self._session.post(
-                "{}/getDevice.json".format(JABLOTRON_API),
-                json={
-                    "id": str(service["service-id"]),
-                    "status": "true",
-                    "type": JABLOTRON_FUTURA_NAMESPACE,
-                    "system": "IOS",
-                    "checksum": "",
-                },
-                headers=JABLOTRON_API_DEFAULT_HEADERS
-                | {JABLOTRON_FUTURA_NAMESPACE_KEY: JABLOTRON_FUTURA_NAMESPACE},
-            ) as result:
-                if result.status != 200:
-                    raise UpdateFailed(
-                        f"Failed to get device: status {result.status}"
-                    )
-                json = await result.json()
-                device = json["device"]
-                _LOGGER.debug(device)
-                self._central_unit = FuturaCentralUnit(
-                    service_id=device["id"],
-                    model=device["type"],
-                    hw_version=device["details"]["hw_revision"],
-                    fw_version=device["details"]["fw_version"],
-                    serial_no=device["details"]["serial_no"],
-                    room_id=device["rooms"][0]["id"],
-                )
-                return json
-        except (TimeoutError, aiohttp.ClientError) as err:
-            raise UpdateFailed(f"Error communicating with Jablotron API: {err}") from err
-
-    async def set_control(self, control, value) -> None:
-        """Sets control value via API"""
-        await self.authorize()
-        async with self._session.post(
-            "{}/setDevice.json".format(JABLOTRON_API),
-            json={
-                "device": {
-                    "type": JABLOTRON_FUTURA_NAMESPACE,
-                    "control": [
-                        {
-                            "manual": {control: value},
-                            "room_id": self._central_unit.room_id,
-                        }
-                    ],
-                    "id": self._central_unit.service_id,
-                },
-                "system": "IOS",
-            },
-            headers=JABLOTRON_API_DEFAULT_HEADERS
-            | {JABLOTRON_FUTURA_NAMESPACE_KEY: JABLOTRON_FUTURA_NAMESPACE},
-        ) as result:
-            return
+            return await self._get_devices()
+        except (ServiceNotFoundError, ApiAuthError):
+            # A cached service may have been removed or re-registered under
+            # another id, so look them up again before giving up.
+            # Replaced only once discovery succeeded, writes keep working
+            _LOGGER.debug("Cached Futura services rejected, discovering again")
+            await self.discover()
+            return await self._get_devices()
 
-    async def set_setting_extended_property(self, prop_name: str, prop_value) -> None:
-        """Sets extended property value via API"""
-        await self.authorize()
-        async with self._session.post(
-            "{}/setDevice.json".format(JABLOTRON_API),
-            json={
-                "device": {
-                    "type": JABLOTRON_FUTURA_NAMESPACE,
-                    "settings": {"extended_properties": {prop_name: prop_value}},
-                    "id": self._central_unit.service_id,
-                },
-                "system": "IOS",
-            },
-            headers=JABLOTRON_API_DEFAULT_HEADERS
-            | {JABLOTRON_FUTURA_NAMESPACE_KEY: JABLOTRON_FUTURA_NAMESPACE},
-        ) as result:
-            return
+    async def _get_devices(self) -> dict[str, FuturaSnapshot]:
+        snapshots = await asyncio.gather(
+            *(self._get_device(service) for service in self._services.values())
+        )
+        return dict(zip(self._services, snapshots))
+
+    async def _get_device(self, service: FuturaService) -> FuturaSnapshot:
+        async with self._semaphore:
+            service.snapshot = await self.transport.fetch(service)
+        return service.snapshot
+
+    async def set_control(self, service_id: str, control, value) -> None:
+        """Sets control value via API
+
+        Changes made within JABLOTRON_WRITE_COALESCE_DELAY are sent together
+        in one setDevice.json request per unit, the latest value of each
+        control wins.
+        """
+        self._service(service_id).pending_controls[control] = value
+        await self._schedule_flush()
+
+    async def set_setting_extended_property(
+        self, service_id: str, prop_name: str, prop_value
+    ) -> None:
+        """Sets extended property value via API, coalesced like set_control"""
+        self._service(service_id).pending_settings[prop_name] = prop_value
+        await self._schedule_flush()
+
+    def _service(self, service_id: str) -> FuturaService:
+        if (service := self._services.get(service_id)) is None:
+            raise ServiceNotFoundError(f"Futura service {service_id} not found")
+        return service
+
+    async def _schedule_flush(self) -> None:
+        if self._flush is None:
+            self._flush = self._hass.async_create_task(
+                self._async_flush(), "jablotron_futura write flush"
+            )
+        # Shielded so one cancelled caller does not drop the others' changes
+        await asyncio.shield(self._flush)
+
+    async def _async_flush(self) -> None:
+        await asyncio.sleep(JABLOTRON_WRITE_COALESCE_DELAY)
+        self._flush = None
+        await asyncio.gather(
+            *(self._flush_service(service) for service in self._services.values())
+        )
+
+    async def _flush_service(self, service: FuturaService) -> None:
+        controls, service.pending_controls = service.pending_controls, {}
+        settings, service.pending_settings = service.pending_settings, {}
+        if controls or settings:
+            await self.transport.write(service, controls, settings)
+            self.writes += 1
+
+    async def prewarm(self) -> None:
+        """Opens the connection of the transport ahead of the first sync"""
+        await self.transport.prewarm()
+
+    async def close(self) -> None:
+        """Releases connections of the transport"""
+        await self.transport.close()
 
-    def central_unit(self) -> FuturaCentralUnit:
-        return self._central_unit
+    def dump(self, service_ids: list[str]) -> dict[str, dict[str, Any]]:
+        """Returns units in a JSON serializable form for restore()"""
+        return {
+            service_id: {
+                "service_type": service.service_type,
+                "room_ids": service.room_ids,
+                "checksum": service.checksum,
+                "central_unit": vars(service.central_unit),
+                "device": service.snapshot.as_device(),
+            }
+            for service_id in service_ids
+            if (service := self._services.get(service_id)) is not None
+            and service.snapshot is not None
+        }
+
+    def restore(self, units: dict[str, dict[str, Any]]) -> dict[str, FuturaSnapshot]:
+        """Restores units saved by dump() unless live data is already known"""
+        if not self._services:
+            try:
+                for service_id, unit in units.items():
+                    service = FuturaService(service_id, unit["service_type"])
+                    service.room_ids = unit["room_ids"]
+                    service.checksum = unit["checksum"]
+                    service.central_unit = FuturaCentralUnit(**unit["central_unit"])
+                    service.snapshot = FuturaSnapshot.from_device(unit["device"])
+                    self._services[service_id] = service
+            except (InvalidPayloadError, KeyError, TypeError) as err:
+                self._services = {}
+                raise InvalidPayloadError(
+                    f"Malformed stored Futura unit: {err}"
+                ) from err
+        return self.snapshots()
+
+    def snapshots(self) -> dict[str, FuturaSnapshot]:
+        """Returns last fetched snapshot of every unit"""
+        return {
+            service_id: service.snapshot
+            for service_id, service in self._services.items()
+            if service.snapshot is not None
+        }
+
+    def central_unit(self, service_id: str) -> FuturaCentralUnit:
+        return self._services[service_id].central_unit
+
+    def central_units(self) -> dict[str, FuturaCentralUnit]:
+        return {
+            service_id: service.central_unit
+            for service_id, service in self._services.items()
+            if service.central_unit is not None
+        }
 
 
 class FuturaEntity(CoordinatorEntity):
-    def __init__(self, coordinator):
+    def __init__(self, coordinator, service_id: str, key: str):
         super().__init__(coordinator)
         self._futura = coordinator.futura
-        self._central_unit = self._futura.central_unit()
+        self._service_id = service_id
+        self._key = key
+        self._central_unit = self._futura.central_unit(service_id)
+        self._optimistic: Any = None
+        # Futura.writes once the optimistic value was sent
+        self._optimistic_writes = 0
+        self._written_fingerprint: tuple[Any, ...] | None = None
+
+    @property
+    def _fingerprint(self) -> tuple[Any, ...]:
+        """Fields the entity exposes, only read while it is available"""
+        return ()
+
+    def _state_fingerprint(self) -> tuple[Any, ...]:
+        available = self.available
+        return (
+            self.coordinator.last_update_success,
+            self.coordinator.stale,
+            available,
+            self._fingerprint if available else None,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Written by the platform right after this
+        self._written_fingerprint = self._state_fingerprint()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Data of a sync started after the write confirms or rolls back the
+        # value assumed for it, older data and failed refreshes keep it
+        if self._futura.synced_writes >= self._optimistic_writes:
+            self._optimistic = None
+        fingerprint = self._state_fingerprint()
+        if fingerprint == self._written_fingerprint:
+            self.coordinator.writes_skipped += 1
+            return
+        self._written_fingerprint = fingerprint
+        self.coordinator.writes_emitted += 1
+        super()._handle_coordinator_update()
+
+    @callback
+    def _async_set_optimistic(self, value: Any) -> None:
+        """Shows value accepted by the API until the read-back refresh"""
+        self._optimistic = value
+        self._optimistic_writes = self._futura.writes
+        # The state no longer shows the fetched data, write the read-back
+        self._written_fingerprint = None
+        self.async_write_ha_state()
+        self.coordinator.async_schedule_read_back()
+
+    @property
+    def snapshot(self) -> FuturaSnapshot | None:
+        return self.coordinator.data.get(self._service_id)
+
+    @property
+    def available(self) -> bool:
+        # The last snapshot is served through failed refreshes until the
+        # staleness budget runs out
+        return not self.coordinator.expired
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        coordinator = self.coordinator
+        if not coordinator.stale and coordinator.last_update_success:
+            return None
+        attributes: dict[str, Any] = {"stale": True}
+        if coordinator.last_updated_from_cloud is not None:
+            attributes["last_updated_from_cloud"] = (
+                coordinator.last_updated_from_cloud.isoformat()
+            )
+        return attributes
+
+    @property
+    def unique_id(self) -> str:
+        return "{}_{}".format(self._central_unit.serial_no, self._key)
 
     @property
     def name(self) -> str | None:
+        if len(self.coordinator.data) == 1:
+            return "{}.{}".format(DOMAIN, self._key)
         return "{}.{}".format(DOMAIN, self.unique_id)
 
     @property
@@ -204,23 +570,29 @@ class FuturaEntity(CoordinatorEntity):
 
 
 class FuturaControlEntity(FuturaEntity):
-    def __init__(self, idx, device_class, coordinator):
-        super().__init__(coordinator)
+    def __init__(self, idx, device_class, coordinator, service_id: str):
+        super().__init__(coordinator, service_id, idx)
         self._idx = idx
         self._device_class = device_class
 
-    def data(self) -> dict[str, Any] | None:
-        controls = self.coordinator.data["device"]["data"]["controls"]
-        matched = [c for c in controls if c["id"] == self._idx]
-        return matched[0] if matched else None
+    def data(self) -> FuturaControl | None:
+        snapshot = self.snapshot
+        return snapshot.controls.get(self._idx) if snapshot else None
+
+    @property
+    def value(self) -> Any:
+        if self._optimistic is not None:
+            return self._optimistic
+        return self.data().value
 
     @property
     def available(self) -> bool:
-        return self.data() is not None
+        return super().available and self.data() is not None
 
     @property
-    def unique_id(self) -> str:
-        return self._idx
+    def _fingerprint(self) -> tuple[Any, ...]:
+        data = self.data()
+        return (self.value, data.min, data.max, data.step, data.units, data.options)
 
     @property
     def device_class(self) -> str | None:
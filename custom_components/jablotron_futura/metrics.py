@@ -0,0 +1,105 @@
+"""Timing and request counters of the Jablotron Futura client."""
+from __future__ import annotations
+
+from collections import Counter, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+import math
+import time
+from typing import Any
+
+from .const import METRICS_WINDOW
+
+
+class LatencyHistogram:
+    """Durations of the last window runs of one phase"""
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        self.count = 0
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Nearest-rank percentile of the window in seconds"""
+        if not self._samples:
+            return None
+        samples = sorted(self._samples)
+        return samples[max(math.ceil(fraction * len(samples)) - 1, 0)]
+
+    @property
+    def last(self) -> float | None:
+        return self._samples[-1] if self._samples else None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Returns the count and p50, p95 and max of the window in ms"""
+
+        def ms(seconds: float | None) -> float | None:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            "count": self.count,
+            "p50_ms": ms(self.percentile(0.5)),
+            "p95_ms": ms(self.percentile(0.95)),
+            "max_ms": ms(max(self._samples, default=None)),
+        }
+
+
+class FuturaMetrics:
+    """Per-phase latency histograms and counters of one Futura client
+
+    Phases are the API endpoints, JSON decoding, snapshot parsing, whole
+    syncs and the coordinator fan-out to entities. Counters hold requests,
+    response bytes, retries and failures.
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, LatencyHistogram] = {}
+        self.counters: Counter[str] = Counter()
+        # Duration and response bytes of the last successful sync
+        self.sync_seconds: float | None = None
+        self.sync_bytes: int | None = None
+        self._request_times: deque[float] = deque()
+
+    @contextmanager
+    def time(self, phase: str) -> Iterator[None]:
+        """Records the duration of the block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def record(self, phase: str, seconds: float) -> None:
+        if (histogram := self.phases.get(phase)) is None:
+            histogram = self.phases[phase] = LatencyHistogram()
+        histogram.add(seconds)
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] += amount
+
+    def request(self, amount: int = 1) -> None:
+        """Counts requests sent to the unit or the API"""
+        self.count("requests", amount)
+        self._request_times.extend([time.monotonic()] * amount)
+
+    def requests_per_hour(self) -> int:
+        """Requests sent within the last hour"""
+        since = time.monotonic() - 3600
+        while self._request_times and self._request_times[0] < since:
+            self._request_times.popleft()
+        return len(self._request_times)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "phases": {
+                phase: histogram.as_dict()
+                for phase, histogram in sorted(self.phases.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "requests_per_hour": self.requests_per_hour(),
+            "sync_seconds": self.sync_seconds,
+            "sync_bytes": self.sync_bytes,
+        }
@@ -7,7 +7,7 @@ from homeassistant.components.number import NumberDeviceClass, NumberEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .__init__ import JablotronFuturaConfigEntry
+from .coordinator import JablotronFuturaConfigEntry
 from .futura import FuturaControlEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -23,7 +23,8 @@ async def async_setup_entry(
 
     async_add_entities(
         [
-            FuturaControlTemperatureEntity(coordinator),
+            FuturaControlTemperatureEntity(coordinator, service_id)
+            for service_id in coordinator.data
         ]
     )
 
@@ -31,31 +32,34 @@ async def async_setup_entry(
 class FuturaControlTemperatureEntity(FuturaControlEntity, NumberEntity):
     """Temperature control entity."""
 
-    def __init__(self, coordinator) -> None:
+    def __init__(self, coordinator, service_id: str) -> None:
         super().__init__(
-            "control_temperature", NumberDeviceClass.TEMPERATURE, coordinator
+            "control_temperature",
+            NumberDeviceClass.TEMPERATURE,
+            coordinator,
+            service_id,
         )
 
     @property
     def native_value(self) -> float | None:
-        return self.data()["extended_properties"]["value"]
+        return self.value
 
     @property
     def native_min_value(self) -> float:
-        return self.data()["extended_properties"]["min"]
+        return self.data().min
 
     @property
     def native_max_value(self) -> float:
-        return self.data()["extended_properties"]["max"]
+        return self.data().max
 
     @property
     def native_step(self) -> float:
-        return self.data()["extended_properties"]["step"]
+        return self.data().step
 
     @property
     def native_unit_of_measurement(self) -> str | None:
-        return self.data()["extended_properties"]["units"]
+        return self.data().units
 
     async def async_set_native_value(self, value: float) -> None:
-        await self._futura.set_control("temperature", value)
-        await self.coordinator.async_refresh()
+        await self._futura.set_control(self._service_id, "temperature", value)
+        self._async_set_optimistic(value)
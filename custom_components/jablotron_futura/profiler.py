@@ -0,0 +1,91 @@
+"""On-demand profiling of Jablotron Futura refreshes."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+import cProfile
+import io
+import logging
+import pstats
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RefreshProfiler:
+    """Profiles the next refreshes of coordinators and their entity updates
+
+    Coordinators holding the profiler run their data update and listener
+    updates under it. The profile also holds whatever else ran on the event
+    loop while a refresh awaited the API. Once the last refresh and its state
+    writes are done, the pstats file and a top-N summary are written to the
+    config directory.
+    """
+
+    def __init__(self, hass: HomeAssistant, refreshes: int, top: int) -> None:
+        self._hass = hass
+        self._profile = cProfile.Profile()
+        self._depth = 0
+        self._top = top
+        self.remaining = refreshes
+        self.done = False
+        name = "{}_profile_{}".format(DOMAIN, dt_util.utcnow().strftime("%Y%m%d%H%M%S"))
+        self.stats_path = hass.config.path("{}.prof".format(name))
+        self.summary_path = hass.config.path("{}.txt".format(name))
+
+    @contextmanager
+    def capture(self) -> Iterator[None]:
+        """Profiles the block, nested and interleaved blocks share one run"""
+        if self._depth == 0:
+            try:
+                self._profile.enable()
+            except ValueError as err:
+                # Another profiler runs, such as the profiler integration's
+                _LOGGER.warning("Jablotron Futura profile cancelled: %s", err)
+                self.done = True
+                yield
+                return
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._profile.disable()
+
+    @callback
+    def refreshed(self) -> None:
+        """Counts a finished data update, the last one ends the profile"""
+        if self.done:
+            return
+        self.remaining -= 1
+        if self.remaining == 0:
+            self._hass.async_create_task(
+                self._async_finish(), "jablotron_futura profile"
+            )
+
+    async def _async_finish(self) -> None:
+        # The coordinator writes the entity states right after the update
+        await asyncio.sleep(0)
+        self.done = True
+        await self._hass.async_add_executor_job(self._write)
+
+    def _write(self) -> None:
+        self._profile.dump_stats(self.stats_path)
+        summary = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        stats.print_stats(self._top)
+        stats.print_stats(DOMAIN, self._top)
+        with open(self.summary_path, "w", encoding="utf-8") as file:
+            file.write(summary.getvalue())
+        _LOGGER.info(
+            "Wrote Jablotron Futura refresh profile to %s and %s",
+            self.stats_path,
+            self.summary_path,
+        )
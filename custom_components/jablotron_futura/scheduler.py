@@ -0,0 +1,85 @@
+"""Adaptive polling interval for the Jablotron Futura coordinator."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import timedelta
+import random
+import time
+
+from .futura import FuturaSnapshot
+
+# Rise of a periphery reading between two refreshes after which the unit is
+# expected to react (boost fans, open bypass), so it is worth watching closely.
+RISING_THRESHOLDS: dict[str, float] = {
+    "fut_co2_ppm_max": 100,
+    "fut_humi_indoor": 5,
+}
+FAST_POLL_WINDOW = 5 * 60
+STABLE_BACKOFF = 1.5
+ERROR_BACKOFF = 2
+ERROR_JITTER = 0.2
+
+
+class FuturaPollScheduler:
+    """Picks the next poll interval from recent writes, readings and errors
+
+    Polls every min_interval for FAST_POLL_WINDOW after a write or a steep
+    rise of CO2 or humidity on any unit, then backs off towards max_interval while the
+    unit is stable. Failed refreshes back off up to ERROR_BACKOFF times the
+    ceiling, with jitter, and wait at least as long as the API asked for.
+    """
+
+    def __init__(self, min_interval: timedelta, max_interval: timedelta) -> None:
+        self.min_interval: timedelta = min_interval
+        self.max_interval: timedelta = max_interval
+        self.interval: timedelta = min_interval
+        self._fast_until: float = 0.0
+        self._last: Mapping[str, FuturaSnapshot] = {}
+
+    @property
+    def fast(self) -> bool:
+        return time.monotonic() < self._fast_until
+
+    def poll_fast(self) -> None:
+        """Opens fast polling window"""
+        self._fast_until = time.monotonic() + FAST_POLL_WINDOW
+        self.interval = self.min_interval
+
+    def success(self, snapshots: Mapping[str, FuturaSnapshot]) -> timedelta:
+        """Returns interval after successful refresh"""
+        if any(
+            self._rising(self._last[service_id], snapshot)
+            for service_id, snapshot in snapshots.items()
+            if service_id in self._last
+        ):
+            self.poll_fast()
+        self._last = snapshots
+        if self.fast:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * STABLE_BACKOFF, self.max_interval)
+        return self.interval
+
+    def failure(self, retry_after: float | None = None) -> timedelta:
+        """Returns interval after failed refresh, at least retry_after seconds"""
+        self.interval = min(
+            max(self.interval, self.min_interval) * ERROR_BACKOFF,
+            self.max_interval * ERROR_BACKOFF,
+        )
+        interval = self.interval * random.uniform(1, 1 + ERROR_JITTER)
+        if retry_after is not None:
+            interval = max(interval, timedelta(seconds=retry_after))
+        return interval
+
+    @staticmethod
+    def _rising(previous: FuturaSnapshot, current: FuturaSnapshot) -> bool:
+        for key, threshold in RISING_THRESHOLDS.items():
+            before = previous.peripheries.get(key)
+            after = current.peripheries.get(key)
+            if before is None or after is None:
+                continue
+            if before.value is None or after.value is None:
+                continue
+            if after.value - before.value >= threshold:
+                return True
+        return False
@@ -2,12 +2,13 @@
 from __future__ import annotations
 
 import logging
+from typing import Any
 
 from homeassistant.components.select import SelectEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .__init__ import JablotronFuturaConfigEntry
+from .coordinator import JablotronFuturaConfigEntry
 from .futura import FuturaControlEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -23,8 +24,12 @@ async def async_setup_entry(
 
     async_add_entities(
         [
-            FuturaControlFanPowerEntity(coordinator),
-            FuturaControlHumidityEntity(coordinator),
+            entity
+            for service_id in coordinator.data
+            for entity in (
+                FuturaControlFanPowerEntity(coordinator, service_id),
+                FuturaControlHumidityEntity(coordinator, service_id),
+            )
         ]
     )
 
@@ -32,30 +37,21 @@ async def async_setup_entry(
 class FuturaControlFanPowerEntity(FuturaControlEntity, SelectEntity):
     """Fan power control entity."""
 
-    def __init__(self, coordinator) -> None:
-        super().__init__(
-            "control_fan_power", None, coordinator
-        )
+    def __init__(self, coordinator, service_id: str) -> None:
+        super().__init__("control_fan_power", None, coordinator, service_id)
 
     @property
     def options(self) -> list[str]:
         data = self.data()
-        device = self.coordinator.data["device"]
-        airflow_units = device["summary"]["airflow_units"]
+        summary = self.snapshot.summary
         airflows = [
-            "{} {}".format(airflow, airflow_units)
-            for airflow in device["summary"]["airflow"]
+            "{} {}".format(airflow, summary.airflow_units)
+            for airflow in summary.airflow
         ]
-        if data["extended_properties"]["min"] == 0:
+        if data.min == 0:
             airflows.insert(0, "off")
 
-        options = [
-            option
-            for option in range(
-                data["extended_properties"]["min"],
-                data["extended_properties"]["max"],
-            )
-        ]
+        options = [option for option in range(data.min, data.max)]
         return [
             "{} ({})".format(option, airflow)
             for option, airflow in zip(options, airflows)
@@ -63,40 +59,40 @@ class FuturaControlFanPowerEntity(FuturaControlEntity, SelectEntity):
 
     @property
     def current_option(self) -> str | None:
-        data = self.data()
-        return self.options[int(data["extended_properties"]["value"])]
+        return self.options[int(self.value)]
+
+    @property
+    def _fingerprint(self) -> tuple[Any, ...]:
+        # Options are labelled with the airflow of each level
+        return (*super()._fingerprint, self.snapshot.summary.airflow)
 
     async def async_select_option(self, option: str) -> None:
-        await self._futura.set_control("fan_power", self.options.index(option))
-        await self.coordinator.async_refresh()
+        value = self.options.index(option)
+        await self._futura.set_control(self._service_id, "fan_power", value)
+        self._async_set_optimistic(value)
 
 
 class FuturaControlHumidityEntity(FuturaControlEntity, SelectEntity):
     """Humidity control entity."""
 
-    def __init__(self, coordinator) -> None:
-        super().__init__("control_humidity", None, coordinator)
+    def __init__(self, coordinator, service_id: str) -> None:
+        super().__init__("control_humidity", None, coordinator, service_id)
 
     @property
     def options(self) -> list[str]:
         data = self.data()
-        return [option["title"] for option in data["extended_properties"]["options"]]
+        return [option.title for option in data.options]
 
     @property
     def current_option(self) -> str | None:
         data = self.data()
-        return [
-            option
-            for option in data["extended_properties"]["options"]
-            if option["id"] == data["extended_properties"]["value"]
-        ][0]["title"]
+        return next(
+            (option.title for option in data.options if option.id == self.value),
+            None,
+        )
 
     async def async_select_option(self, option: str) -> None:
         data = self.data()
-        value = [
-            opt
-            for opt in data["extended_properties"]["options"]
-            if opt["title"] == option
-        ][0]["id"]
-        await self._futura.set_control("humidity", value)
-        await self.coordinator.async_refresh()
+        value = [opt for opt in data.options if opt.title == option][0].id
+        await self._futura.set_control(self._service_id, "humidity", value)
+        self._async_set_optimistic(value)
@@ -1,7 +1,10 @@
 """Sensor definitions for Jablotron Futura integration."""
 from __future__ import annotations
 
-from datetime import date, datetime
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 import logging
 from typing import Any
 
@@ -11,15 +14,25 @@ from homeassistant.components.sensor import (
     SensorEntityDescription,
     SensorStateClass,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
+from homeassistant.util import dt as dt_util
 
-from .__init__ import JablotronFuturaConfigEntry
-from .futura import FuturaEntity
+from .const import CONF_MAX_STATE_AGE
+from .coordinator import (
+    FuturaCoordinator,
+    JablotronFuturaConfigEntry,
+    default_sensor_filters,
+)
+from .futura import FuturaEntity, FuturaPeriphery
 
 _LOGGER = logging.getLogger(__name__)
 
+# Polls the API health sensors, their values change without a refresh
+SCAN_INTERVAL = timedelta(minutes=1)
+
 
 SUMMARY_SENSORS: tuple[SensorEntityDescription, ...] = (
     SensorEntityDescription(
@@ -62,6 +75,75 @@ PERIPHERY_SENSORS: tuple[SensorEntityDescription, ...] = (
 )
 
 
+def _milliseconds(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class ApiHealthSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor reading the client metrics of the coordinator."""
+
+    value_fn: Callable[[FuturaCoordinator], StateType | datetime]
+
+
+# Read the account's client, created once per account
+API_HEALTH_SENSORS: tuple[ApiHealthSensorEntityDescription, ...] = (
+    ApiHealthSensorEntityDescription(
+        key="api_requests_per_hour",
+        name="API Requests per Hour",
+        native_unit_of_measurement="requests/h",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: coordinator.futura.metrics.requests_per_hour(),
+    ),
+    ApiHealthSensorEntityDescription(
+        key="api_last_refresh_duration",
+        name="API Last Refresh Duration",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: _milliseconds(
+            coordinator.futura.metrics.sync_seconds
+        ),
+    ),
+    ApiHealthSensorEntityDescription(
+        key="api_get_device_latency",
+        name="API getDevice Median Latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: _milliseconds(
+            phase.percentile(0.5)
+            if (phase := coordinator.futura.metrics.phases.get("getDevice"))
+            else None
+        ),
+    ),
+    ApiHealthSensorEntityDescription(
+        key="api_response_bytes",
+        name="API Response Bytes per Refresh",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: coordinator.futura.metrics.sync_bytes,
+    ),
+)
+
+# Read the entry's coordinator, created for the first unit of each entry
+REFRESH_HEALTH_SENSORS: tuple[ApiHealthSensorEntityDescription, ...] = (
+    ApiHealthSensorEntityDescription(
+        key="api_consecutive_failures",
+        name="API Consecutive Failures",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: coordinator.consecutive_failures,
+    ),
+    ApiHealthSensorEntityDescription(
+        key="api_last_successful_sync",
+        name="API Last Successful Sync",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda coordinator: coordinator.last_updated_from_cloud,
+    ),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: JablotronFuturaConfigEntry,
@@ -69,85 +151,199 @@ async def async_setup_entry(
 ) -> None:
     """Set up Futura sensors."""
     coordinator = entry.runtime_data
+    options = default_sensor_filters() | entry.options
 
     async_add_entities(
         [
-            FuturaSummarySensorEntity(coordinator, description)
+            FuturaSummarySensorEntity(coordinator, service_id, description, options)
+            for service_id in coordinator.data
             for description in SUMMARY_SENSORS
         ]
         + [
-            FuturaPeripherySensorEntity(coordinator, description)
+            FuturaPeripherySensorEntity(coordinator, service_id, description, options)
+            for service_id in coordinator.data
             for description in PERIPHERY_SENSORS
         ]
     )
+    service_id = next(iter(coordinator.data))
+    descriptions = REFRESH_HEALTH_SENSORS
+    account = coordinator.account
+    if account.health_entry_id in (None, entry.entry_id):
+        # Entries of one account share its client and its counters
+        account.health_entry_id = entry.entry_id
+        descriptions = API_HEALTH_SENSORS + descriptions
+    async_add_entities(
+        FuturaApiHealthSensorEntity(coordinator, service_id, description)
+        for description in descriptions
+    )
 
 
-class FuturaSummarySensorEntity(FuturaEntity, SensorEntity):
-    """Futura summary sensor entity."""
+class FuturaSensorEntity(FuturaEntity, SensorEntity, ABC):
+    """Futura sensor publishing fetched values beyond its deadband.
+
+    The state keeps the last published value until a fetched value differs
+    from it by at least the deadband, or the published value is older than
+    the max age; the heartbeat then publishes whatever drifted within the
+    deadband.
+    """
 
     entity_description: SensorEntityDescription
 
-    def __init__(self, coordinator, description: SensorEntityDescription) -> None:
-        super().__init__(coordinator)
+    def __init__(
+        self,
+        coordinator: FuturaCoordinator,
+        service_id: str,
+        description: SensorEntityDescription,
+        options: Mapping[str, Any],
+    ) -> None:
+        super().__init__(coordinator, service_id, description.key)
         self.entity_description = description
+        self._deadband: float = options["{}_deadband".format(description.key)]
+        self._precision: int = options["{}_precision".format(description.key)]
+        self._max_age = timedelta(seconds=options[CONF_MAX_STATE_AGE])
+        self._published: float | None = None
+        self._published_at: datetime | None = None
 
     @property
-    def unique_id(self) -> str:
-        return self.entity_description.key
+    @abstractmethod
+    def _fetched_value(self) -> float | None:
+        """Value of the last fetched snapshot, before rounding"""
 
-    @property
-    def available(self) -> bool:
-        return self.entity_description.key in self.coordinator.data["device"]["summary"]
+    def _rounded_value(self) -> float | None:
+        value = self._fetched_value
+        if value is None:
+            return None
+        if self._precision == 0:
+            return round(value)
+        return round(value, self._precision)
+
+    @callback
+    def _async_publish(self) -> None:
+        value = self._rounded_value()
+        now = dt_util.utcnow()
+        if (
+            value is None
+            or self._published is None
+            # Rounded so float noise does not fall just short of the deadband
+            or round(abs(value - self._published), self._precision) >= self._deadband
+            or now - self._published_at >= self._max_age
+        ):
+            self._published = value
+            self._published_at = now
+
+    async def async_added_to_hass(self) -> None:
+        self._async_publish()
+        await super().async_added_to_hass()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._async_publish()
+        super()._handle_coordinator_update()
 
     @property
     def native_value(self) -> StateType | date | datetime:
-        return self.coordinator.data["device"]["summary"][self.entity_description.key]
+        return self._published
 
     @property
     def state_class(self) -> SensorStateClass | str | None:
         return SensorStateClass.MEASUREMENT
 
+    @property
+    def _fingerprint(self) -> tuple[Any, ...]:
+        return (self.native_value, self.native_unit_of_measurement)
+
+
+class FuturaSummarySensorEntity(FuturaSensorEntity):
+    """Futura summary sensor entity."""
+
+    @property
+    def available(self) -> bool:
+        return (
+            super().available
+            and self.snapshot is not None
+            and self._fetched_value is not None
+        )
+
+    @property
+    def _fetched_value(self) -> float | None:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        return getattr(snapshot.summary, self.entity_description.key)
+
     @property
     def native_unit_of_measurement(self) -> str | None:
-        return self.coordinator.data["device"]["summary"][
-            "{}_units".format(self.entity_description.key)
-        ]
+        return getattr(
+            self.snapshot.summary, "{}_units".format(self.entity_description.key)
+        )
 
 
-class FuturaPeripherySensorEntity(FuturaEntity, SensorEntity):
+class FuturaPeripherySensorEntity(FuturaSensorEntity):
     """Futura periphery sensor entity."""
 
-    entity_description: SensorEntityDescription
+    @property
+    def periphery(self) -> FuturaPeriphery | None:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        return snapshot.peripheries.get(self.entity_description.key)
+
+    @property
+    def available(self) -> bool:
+        return super().available and self.periphery is not None
+
+    @property
+    def _fetched_value(self) -> float | None:
+        periphery = self.periphery
+        if periphery is None:
+            return None
+        return periphery.value
 
-    def __init__(self, coordinator, description: SensorEntityDescription) -> None:
-        super().__init__(coordinator)
+    @property
+    def native_unit_of_measurement(self) -> str | None:
+        return self.periphery.units
+
+
+class FuturaApiHealthSensorEntity(FuturaEntity, SensorEntity):
+    """Diagnostic sensor charting the Jablotron cloud API behavior.
+
+    Disabled by default. Polled every minute besides coordinator updates,
+    so rates and failure counts move while refreshes keep failing.
+    """
+
+    entity_description: ApiHealthSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: FuturaCoordinator,
+        service_id: str,
+        description: ApiHealthSensorEntityDescription,
+    ) -> None:
+        super().__init__(coordinator, service_id, description.key)
         self.entity_description = description
 
     @property
-    def periphery(self) -> dict[str, Any] | None:
-        peripheries = self.coordinator.data["device"]["peripheries"]
-        filtered = [
-            p for p in peripheries if p["id"] == self.entity_description.key
-        ]
-        return filtered[0] if filtered else None
+    def should_poll(self) -> bool:
+        return True
+
+    async def async_update(self) -> None:
+        """Values are read from the client metrics, nothing to fetch"""
 
     @property
     def available(self) -> bool:
-        return self.periphery is not None
+        # Reports on the API, especially while it fails
+        return True
 
     @property
-    def unique_id(self) -> str:
-        return self.entity_description.key
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        return None
 
     @property
     def native_value(self) -> StateType | date | datetime:
-        value = self.periphery["extended_properties"]["value"]
-        return round(value, 1) if value else None
+        return self.entity_description.value_fn(self.coordinator)
 
     @property
-    def state_class(self) -> SensorStateClass | str | None:
-        return SensorStateClass.MEASUREMENT
-
-    @property
-    def native_unit_of_measurement(self) -> str | None:
-        return self.periphery["extended_properties"]["units"]
+    def _fingerprint(self) -> tuple[Any, ...]:
+        return (self.native_value,)
@@ -0,0 +1,60 @@
+"""Services of the Jablotron Futura integration."""
+
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import (
+    ATTR_REFRESHES,
+    ATTR_TOP,
+    DEFAULT_PROFILE_REFRESHES,
+    DEFAULT_PROFILE_TOP,
+    DOMAIN,
+    SERVICE_PROFILE,
+)
+from .coordinator import FuturaCoordinator
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_REFRESHES, default=DEFAULT_PROFILE_REFRESHES): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional(ATTR_TOP, default=DEFAULT_PROFILE_TOP): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=500)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Profile the next refreshes of every loaded entry."""
+        coordinators: list[FuturaCoordinator] = [
+            entry.runtime_data
+            for entry in hass.config_entries.async_loaded_entries(DOMAIN)
+        ]
+        if not coordinators:
+            raise HomeAssistantError("No Jablotron Futura entry is loaded")
+        if any(
+            coordinator.profiler is not None and not coordinator.profiler.done
+            for coordinator in coordinators
+        ):
+            raise HomeAssistantError("A Jablotron Futura profile is already running")
+        # cProfile is only loaded once a profile is asked for
+        from .profiler import RefreshProfiler
+
+        profiler = RefreshProfiler(
+            hass, call.data[ATTR_REFRESHES], call.data[ATTR_TOP]
+        )
+        for coordinator in coordinators:
+            coordinator.profiler = profiler
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
@@ -0,0 +1,64 @@
+"""Single-flight execution of Jablotron Futura API operations."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+
+class SingleFlight[T]:
+    """Runs one call of an operation at a time, concurrent callers share it
+
+    join() awaits the running call, or starts one. follow() is for callers
+    that need a result fetched after they asked (a read-back after a write):
+    it queues at most one trailing call behind the running one, so any
+    number of requests made during a call fold into a single repeat.
+    """
+
+    def __init__(self, hass: HomeAssistant, name: str) -> None:
+        self._hass = hass
+        self._name = name
+        self._running: asyncio.Task[T] | None = None
+        self._trailing: asyncio.Task[T] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._running is not None
+
+    async def join(self, func: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """Awaits the running call, starting one if there is none"""
+        if self._running is None:
+            task = self._hass.async_create_task(func(), self._name)
+            if not task.done():
+                self._running = task
+                task.add_done_callback(self._done)
+        else:
+            task = self._running
+        # Shielded so one cancelled caller does not cancel the others' call
+        return await asyncio.shield(task)
+
+    async def follow(self, func: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """Awaits a call started after this request, queueing at most one"""
+        if self._running is None:
+            return await self.join(func)
+        if self._trailing is None:
+            self._trailing = self._hass.async_create_task(
+                self._after(self._running, func), "{} (trailing)".format(self._name)
+            )
+        return await asyncio.shield(self._trailing)
+
+    async def _after(
+        self, running: asyncio.Task[T], func: Callable[[], Coroutine[Any, Any, T]]
+    ) -> T:
+        await asyncio.wait([running])
+        self._trailing = None
+        return await self.join(func)
+
+    def _done(self, task: asyncio.Task[T]) -> None:
+        if self._running is task:
+            self._running = None
+        if not task.cancelled():
+            # Retrieved by the callers, unless all of them were cancelled
+            task.exception()
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 from enum import StrEnum
+from typing import Any
 
 from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity
 
@@ -17,7 +18,8 @@ async def async_setup_entry(hass, entry, async_add_entities):
 
     async_add_entities(
         [
-            FuturaSettingsSwitchEntity(idx, device_class, coordinator)
+            FuturaSettingsSwitchEntity(idx, device_class, coordinator, service_id)
+            for service_id in coordinator.data
             for idx, device_class in [
                 ("bypass", SwitchDeviceClass.SWITCH),
                 ("cooling", SwitchDeviceClass.SWITCH),
@@ -34,28 +36,29 @@ class FuturaEnabledEnum(StrEnum):
 
 
 class FuturaSettingsSwitchEntity(FuturaEntity, SwitchEntity):
-    def __init__(self, idx, device_class, coordinator):
-        super().__init__(coordinator)
+    def __init__(self, idx, device_class, coordinator, service_id: str):
+        super().__init__(coordinator, service_id, idx)
         self._idx = idx
         self._device_class = device_class
 
     @property
-    def unique_id(self) -> str:
-        return self._idx
-
-    @property
-    def value(self) -> str:
-        return self.coordinator.data["device"]["settings"]["extended_properties"][
-            self._idx
-        ]
+    def value(self) -> str | None:
+        if self._optimistic is not None:
+            return self._optimistic
+        snapshot = self.snapshot
+        return getattr(snapshot.settings, self._idx) if snapshot else None
 
     @property
     def is_on(self) -> bool:
         return self.value == FuturaEnabledEnum.ENABLED
 
+    @property
+    def _fingerprint(self) -> tuple[Any, ...]:
+        return (self.value,)
+
     @property
     def available(self) -> bool:
-        return self.value in list(map(str, FuturaEnabledEnum))
+        return super().available and self.value in list(map(str, FuturaEnabledEnum))
 
     @property
     def device_class(self) -> str | None:
@@ -63,12 +66,12 @@ class FuturaSettingsSwitchEntity(FuturaEntity, SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         await self._futura.set_setting_extended_property(
-            self._idx, FuturaEnabledEnum.ENABLED
+            self._service_id, self._idx, FuturaEnabledEnum.ENABLED
         )
-        await self.coordinator.async_refresh()
+        self._async_set_optimistic(FuturaEnabledEnum.ENABLED)
 
     async def async_turn_off(self, **kwargs):
         await self._futura.set_setting_extended_property(
-            self._idx, FuturaEnabledEnum.DISABLED
+            self._service_id, self._idx, FuturaEnabledEnum.DISABLED
         )
-        await self.coordinator.async_refresh()
+        self._async_set_optimistic(FuturaEnabledEnum.DISABLED)
@@ -1,6 +1,10 @@
 """Fixtures for Jablotron Futura tests."""
 from __future__ import annotations
 
+import asyncio
+from copy import deepcopy
+from http.cookies import SimpleCookie
+import json
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -13,6 +17,9 @@ from custom_components.jablotron_futura.const import (
     CONF_USERNAME,
     DOMAIN,
 )
+from custom_components.jablotron_futura.futura import Futura
+
+from .fake_cloud import FakeJablotronCloud
 
 @pytest.fixture(autouse=True)
 def auto_enable_custom_integrations(enable_custom_integrations):
@@ -20,6 +27,22 @@ def auto_enable_custom_integrations(enable_custom_integrations):
     yield
 
 
+@pytest.fixture(autouse=True)
+def no_write_delay():
+    """Flush coalesced writes without waiting for more changes."""
+    with patch(
+        "custom_components.jablotron_futura.futura.JABLOTRON_WRITE_COALESCE_DELAY", 0
+    ):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay():
+    """Retry failed API requests without backing off."""
+    with patch("custom_components.jablotron_futura.cloud.JABLOTRON_RETRY_BACKOFF", 0):
+        yield
+
+
 MOCK_USERNAME = "test@example.com"
 MOCK_PASSWORD = "testpassword"
 
@@ -33,6 +56,7 @@ MOCK_SERVICE_LIST_RESPONSE = {
         "services": [
             {
                 "service-id": 12345,
+                "name": "Futura 2",
                 "visible": True,
                 "status": "ENABLED",
                 "service-type": "FUTURA2",
@@ -114,21 +138,63 @@ MOCK_DEVICE_RESPONSE = {
                 },
             ]
         },
+        "settings": {
+            "extended_properties": {
+                "bypass": "enabled",
+                "cooling": "disabled",
+                "heating": "enabled",
+                "radon_protection": "disabled",
+            }
+        },
     }
 }
 
 
+MOCK_SECOND_SERVICE_LIST_RESPONSE = {
+    "data": {
+        "services": MOCK_SERVICE_LIST_RESPONSE["data"]["services"]
+        + [
+            {
+                "service-id": 67890,
+                "name": "Futura 2 Garage",
+                "visible": True,
+                "status": "ENABLED",
+                "service-type": "FUTURA2",
+            }
+        ]
+    }
+}
+
+
+def create_device_response(service_id: str, serial_no: str) -> dict:
+    """Create a device response for another Futura unit."""
+    response = deepcopy(MOCK_DEVICE_RESPONSE)
+    response["device"]["id"] = service_id
+    response["device"]["details"]["serial_no"] = serial_no
+    return response
+
+
 class MockResponse:
     """Mock aiohttp response."""
 
-    def __init__(self, json_data, status=200):
+    def __init__(self, json_data, status=200, cookies=None, gate=None, headers=None):
         self._json_data = json_data
         self.status = status
+        self.cookies = SimpleCookie(cookies or {})
+        self.headers = headers or {}
+        self._gate = gate
 
     async def json(self):
         return self._json_data
 
+    async def read(self):
+        return json.dumps(self._json_data).encode()
+
     async def __aenter__(self):
+        # Let other tasks run while the request is in flight
+        await asyncio.sleep(0)
+        if self._gate is not None:
+            await self._gate.wait()
         return self
 
     async def __aexit__(self, *args):
@@ -140,26 +206,57 @@ def create_mock_session(
     service_list_response=None,
     device_response=None,
     set_device_status=200,
+    device_status=200,
+    devices=None,
+    device_gate=None,
+    device_headers=None,
 ):
-    """Create a mock aiohttp session that simulates the Jablotron API."""
+    """Create a mock aiohttp session that simulates the Jablotron API.
+
+    Every request is recorded in ``mock_session.calls`` as an
+    ``(endpoint, json)`` tuple. When ``device_gate`` is an ``asyncio.Event``,
+    getDevice responses are held back until it is set. ``device_status``
+    entries may be exceptions, raised instead of answering.
+    """
     if service_list_response is None:
         service_list_response = MOCK_SERVICE_LIST_RESPONSE
     if device_response is None:
         device_response = MOCK_DEVICE_RESPONSE
 
+    calls = []
+
     def mock_post(url, **kwargs):
+        calls.append((url.rsplit("/", 1)[-1], kwargs.get("json")))
         if "userAuthorize" in url:
-            return MockResponse({}, status=auth_status)
+            return MockResponse(
+                {}, status=auth_status, cookies={"PHPSESSID": "session1"}
+            )
         elif "serviceListGet" in url:
             return MockResponse(service_list_response)
         elif "getDevice" in url:
-            return MockResponse(device_response)
+            status = (
+                device_status.pop(0)
+                if isinstance(device_status, list)
+                else device_status
+            )
+            if isinstance(status, Exception):
+                raise status
+            if devices is not None:
+                response = devices[kwargs["json"]["id"]]
+            elif isinstance(device_response, list):
+                response = device_response.pop(0)
+            else:
+                response = device_response
+            return MockResponse(
+                response, status=status, gate=device_gate, headers=device_headers
+            )
         elif "setDevice" in url:
             return MockResponse({}, status=set_device_status)
         return MockResponse({}, status=404)
 
     mock_session = AsyncMock()
     mock_session.post = mock_post
+    mock_session.calls = calls
     return mock_session
 
 
@@ -179,12 +276,32 @@ def mock_session_auth_failure():
 def mock_setup(mock_session):
     """Fixture that patches aiohttp_client to return mock session."""
     with patch(
-        "custom_components.jablotron_futura.futura.aiohttp_client.async_get_clientsession",
+        "custom_components.jablotron_futura.cloud.async_create_session",
         return_value=mock_session,
     ) as mock_client:
         yield mock_client
 
 
+@pytest.fixture
+async def fake_cloud(socket_enabled):
+    """Fixture providing a running Jablotron cloud stand-in serving one unit."""
+    cloud = FakeJablotronCloud(MOCK_USERNAME, MOCK_PASSWORD, seed=0)
+    cloud.add_unit("12345", MOCK_DEVICE_RESPONSE["device"])
+    await cloud.start()
+    with patch("custom_components.jablotron_futura.cloud.JABLOTRON_API", cloud.url):
+        yield cloud
+    await cloud.stop()
+
+
+def create_futura(hass: HomeAssistant, mock_session) -> Futura:
+    """Create a Futura client bound to a mock session."""
+    with patch(
+        "custom_components.jablotron_futura.cloud.async_create_session",
+        return_value=mock_session,
+    ):
+        return Futura.from_config(hass, MOCK_CONFIG)
+
+
 def create_mock_entry():
     """Create a MockConfigEntry for the integration."""
     return MockConfigEntry(
@@ -194,16 +311,17 @@ def create_mock_entry():
     )
 
 
-async def setup_integration(hass: HomeAssistant, mock_session=None):
+async def setup_integration(hass: HomeAssistant, mock_session=None, entry=None):
     """Set up the integration with a mock session."""
     if mock_session is None:
         mock_session = create_mock_session()
+    if entry is None:
+        entry = create_mock_entry()
 
-    entry = create_mock_entry()
     entry.add_to_hass(hass)
 
     with patch(
-        "custom_components.jablotron_futura.futura.aiohttp_client.async_get_clientsession",
+        "custom_components.jablotron_futura.cloud.async_create_session",
         return_value=mock_session,
     ):
         await hass.config_entries.async_setup(entry.entry_id)
@@ -0,0 +1,264 @@
+"""Local stand-in for the Jablotron cloud API.
+
+Serves ``userAuthorize.json``, ``serviceListGet.json``, ``getDevice.json``
+and ``setDevice.json`` for any number of simulated Futura units over real
+HTTP, so ``Futura`` and ``FuturaCoordinator`` can be exercised end to end
+without network access. Latency, random 5xx errors and 429 answers are
+configurable; ``setDevice`` changes the unit state served afterwards and the
+device checksum follows the state.
+
+Run it standalone to load it from other tools::
+
+    python -m tests.fake_cloud --port 8080 --units 3 --latency 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from copy import deepcopy
+import hashlib
+import json
+import random
+import secrets
+from typing import Any
+
+from aiohttp import web
+
+SESSION_COOKIE = "PHPSESSID"
+API_PATH = "/api/2.2"
+
+
+class FakeFuturaUnit:
+    """Futura service of the fake cloud and its mutable device document"""
+
+    def __init__(self, service_id: str, name: str, device: dict[str, Any]) -> None:
+        self.service_id = service_id
+        self.name = name
+        self.device = device
+        self.device["id"] = service_id
+
+    @property
+    def checksum(self) -> str:
+        """Changes whenever the device document does"""
+        document = json.dumps(self.device, sort_keys=True).encode()
+        return hashlib.sha1(document).hexdigest()
+
+    def set_periphery(self, periphery_id: str, value: float) -> None:
+        for periphery in self.device["peripheries"]:
+            if periphery["id"] == periphery_id:
+                periphery["extended_properties"]["value"] = value
+                return
+        raise KeyError(periphery_id)
+
+    def control(self, control_id: str) -> Any:
+        for control in self.device["data"]["controls"]:
+            if control["id"] == control_id:
+                return control["extended_properties"]["value"]
+        raise KeyError(control_id)
+
+    def apply(self, change: dict[str, Any]) -> None:
+        """Applies a setDevice.json device document"""
+        for control in change.get("control", []):
+            for key, value in control["manual"].items():
+                for entry in self.device["data"]["controls"]:
+                    if entry["id"] == "control_{}".format(key):
+                        entry["extended_properties"]["value"] = value
+        if "settings" in change:
+            self.device["settings"]["extended_properties"].update(
+                change["settings"]["extended_properties"]
+            )
+
+
+class FakeJablotronCloud:
+    """aiohttp server answering like api.jablonet.net
+
+    Every request is recorded in ``requests`` as an ``(endpoint, headers)``
+    tuple and the client port of each connection in ``connections``. Besides
+    the random ``error_rate`` (500) and ``rate_limit_rate`` (429 with
+    ``retry_after``), fail() queues answers for the next requests to an
+    endpoint.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1,
+        seed: int | None = None,
+    ) -> None:
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.units: dict[str, FakeFuturaUnit] = {}
+        self.requests: list[tuple[str, dict[str, str]]] = []
+        self.connections: set[int] = set()
+        self.url: str | None = None
+        self._sessions: set[str] = set()
+        self._failures: dict[str, list[tuple[int, dict[str, str]]]] = {}
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+
+    def add_unit(
+        self, service_id: str, device: dict[str, Any], name: str = "Futura 2"
+    ) -> FakeFuturaUnit:
+        """Adds a unit served from a copy of a getDevice.json device document"""
+        unit = FakeFuturaUnit(service_id, name, deepcopy(device))
+        self.units[service_id] = unit
+        return unit
+
+    def fail(
+        self,
+        endpoint: str,
+        status: int,
+        times: int = 1,
+        retry_after: float | None = None,
+    ) -> None:
+        """Answers the next requests to the endpoint with the status"""
+        headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+        self._failures.setdefault(endpoint, []).extend([(status, headers)] * times)
+
+    def expire_sessions(self) -> None:
+        """Rejects every session issued so far"""
+        self._sessions.clear()
+
+    def endpoints(self) -> list[str]:
+        return [endpoint for endpoint, _ in self.requests]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        app = web.Application()
+        app.router.add_post(API_PATH + "/{endpoint}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = "http://{}:{}{}".format(host, port, API_PATH)
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        endpoint = request.match_info["endpoint"]
+        self.requests.append((endpoint, dict(request.headers)))
+        self.connections.add(request.transport.get_extra_info("peername")[1])
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if queued := self._failures.get(endpoint):
+            status, headers = queued.pop(0)
+            return web.json_response({}, status=status, headers=headers)
+        if self._random.random() < self.rate_limit_rate:
+            return web.json_response(
+                {}, status=429, headers={"Retry-After": str(self.retry_after)}
+            )
+        if self._random.random() < self.error_rate:
+            return web.json_response({}, status=500)
+
+        payload = await request.json()
+        if endpoint == "userAuthorize.json":
+            return self._authorize(payload)
+        if request.cookies.get(SESSION_COOKIE) not in self._sessions:
+            return web.json_response({}, status=401)
+        if endpoint == "serviceListGet.json":
+            return self._service_list()
+        if endpoint == "getDevice.json":
+            return self._get_device(payload)
+        if endpoint == "setDevice.json":
+            return self._set_device(payload)
+        return web.json_response({}, status=404)
+
+    def _authorize(self, payload: dict[str, Any]) -> web.Response:
+        if (payload.get("login"), payload.get("password")) != (
+            self.username,
+            self.password,
+        ):
+            return web.json_response({}, status=401)
+        token = secrets.token_hex(16)
+        self._sessions.add(token)
+        response = web.json_response({})
+        response.set_cookie(SESSION_COOKIE, token)
+        return response
+
+    def _service_list(self) -> web.Response:
+        return web.json_response(
+            {
+                "data": {
+                    "services": [
+                        {
+                            "service-id": int(unit.service_id),
+                            "name": unit.name,
+                            "visible": True,
+                            "status": "ENABLED",
+                            "service-type": "FUTURA2",
+                        }
+                        for unit in self.units.values()
+                    ]
+                }
+            }
+        )
+
+    def _get_device(self, payload: dict[str, Any]) -> web.Response:
+        if (unit := self.units.get(str(payload.get("id")))) is None:
+            return web.json_response({}, status=404)
+        checksum = unit.checksum
+        if payload.get("checksum") == checksum:
+            return web.json_response({"checksum": checksum})
+        response = web.json_response({"device": unit.device, "checksum": checksum})
+        response.enable_compression()
+        return response
+
+    def _set_device(self, payload: dict[str, Any]) -> web.Response:
+        change = payload["device"]
+        if (unit := self.units.get(str(change.get("id")))) is None:
+            return web.json_response({}, status=404)
+        unit.apply(change)
+        return web.json_response({})
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    from .conftest import MOCK_DEVICE_RESPONSE
+
+    cloud = FakeJablotronCloud(
+        args.username,
+        args.password,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    )
+    for index in range(args.units):
+        unit = cloud.add_unit(
+            str(12345 + index),
+            MOCK_DEVICE_RESPONSE["device"],
+            "Futura {}".format(index + 1),
+        )
+        unit.device["details"]["serial_no"] = "SN{:09d}".format(123456789 + index)
+    await cloud.start(args.host, args.port)
+    print("Fake Jablotron cloud API at {}".format(cloud.url))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await cloud.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--username", default="test@example.com")
+    parser.add_argument("--password", default="testpassword")
+    parser.add_argument("--units", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
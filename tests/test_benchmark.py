@@ -0,0 +1,197 @@
+"""Benchmarks of the refresh, parse and entity update hot paths.
+
+Run with pytest-benchmark and keep the results as JSON to compare versions:
+
+    python -m pytest tests/test_benchmark.py --benchmark-autosave
+    python -m pytest tests/test_benchmark.py --benchmark-compare
+
+Counts that do not depend on the machine (requests per sync, entity property
+reads per update, event loop time per refresh) are stored in the
+``extra_info`` of each benchmark.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from copy import deepcopy
+from dataclasses import replace
+import importlib
+import itertools
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.jablotron_futura.futura import (
+    Futura,
+    FuturaEntity,
+    FuturaSnapshot,
+)
+
+from .conftest import (
+    MOCK_CONFIG,
+    MOCK_DEVICE_RESPONSE,
+    create_mock_session,
+    setup_integration,
+)
+
+PACKAGE = "custom_components.jablotron_futura"
+PLATFORMS = ["binary_sensor", "number", "select", "sensor", "switch"]
+ROUNDS = 50
+
+
+def create_device(peripheries: int) -> dict:
+    """Create a device document with the given number of peripheries."""
+    device = deepcopy(MOCK_DEVICE_RESPONSE["device"])
+    properties = device["peripheries"][0]["extended_properties"]
+    device["peripheries"] += [
+        {"id": "fut_extra_{}".format(index), "extended_properties": dict(properties)}
+        for index in range(peripheries - len(device["peripheries"]))
+    ]
+    return device
+
+
+def create_co2_response(co2: float) -> dict:
+    """Create a device response whose sensors differ with the CO2 reading."""
+    response = deepcopy(MOCK_DEVICE_RESPONSE)
+    response["device"]["peripheries"][0]["extended_properties"]["value"] = co2
+    response["device"]["summary"]["filter_health"] = int(co2) % 100
+    return response
+
+
+@contextmanager
+def count_property_reads() -> Iterator[Counter[str]]:
+    """Count reads of the properties of every Futura entity class."""
+    reads: Counter[str] = Counter()
+    classes = {FuturaEntity} | {
+        cls
+        for platform in PLATFORMS
+        for cls in vars(
+            importlib.import_module("{}.{}".format(PACKAGE, platform))
+        ).values()
+        if isinstance(cls, type) and issubclass(cls, FuturaEntity)
+    }
+
+    def counting(name: str, fget):
+        def read(self):
+            reads[name] += 1
+            return fget(self)
+
+        return property(read)
+
+    patchers = [
+        patch.object(cls, name, counting(name, attribute.fget))
+        for cls in classes
+        for name, attribute in vars(cls).items()
+        if isinstance(attribute, property)
+    ]
+    for patcher in patchers:
+        patcher.start()
+    try:
+        yield reads
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+@pytest.mark.parametrize("changed", [False, True], ids=["unchanged", "changed"])
+def test_sync(hass: HomeAssistant, fake_cloud, benchmark, changed: bool):
+    """Benchmark Futura.sync() of three units against the local cloud."""
+    for index in (1, 2):
+        unit = fake_cloud.add_unit(str(12345 + index), MOCK_DEVICE_RESPONSE["device"])
+        unit.device["details"]["serial_no"] = "SN{}".format(123456789 + index)
+
+    async def connect() -> Futura:
+        # The HTTP session must be created on the running loop
+        futura = Futura.from_config(hass, MOCK_CONFIG)
+        await futura.sync()
+        return futura
+
+    futura = hass.loop.run_until_complete(connect())
+    fake_cloud.requests.clear()
+    readings = itertools.count()
+    # Counted, --benchmark-disable runs the function only once
+    syncs = 0
+
+    def change():
+        if changed:
+            for unit in fake_cloud.units.values():
+                unit.set_periphery("fut_co2_ppm_max", 700 + next(readings))
+
+    def sync():
+        nonlocal syncs
+        syncs += 1
+        hass.loop.run_until_complete(futura.sync())
+
+    benchmark.pedantic(sync, setup=change, rounds=ROUNDS)
+    hass.loop.run_until_complete(futura.close())
+
+    requests = len(fake_cloud.requests) / syncs
+    benchmark.extra_info["requests_per_sync"] = requests
+    assert requests == 3
+
+
+@pytest.mark.parametrize("peripheries", [4, 64, 1024])
+def test_parse_device(benchmark, peripheries: int):
+    """Benchmark parsing device documents of growing size."""
+    device = create_device(peripheries)
+    benchmark.extra_info["document_bytes"] = len(json.dumps(device))
+
+    snapshot = benchmark(FuturaSnapshot.from_device, device)
+
+    assert len(snapshot.peripheries) == peripheries
+
+
+def test_entity_update(hass: HomeAssistant, benchmark):
+    """Benchmark one coordinator update reaching the entities of all platforms."""
+    entry = hass.loop.run_until_complete(setup_integration(hass))
+    coordinator = entry.runtime_data
+    snapshots = [
+        FuturaSnapshot.from_device(create_co2_response(co2)["device"])
+        for co2 in (700.0, 900.0)
+    ]
+    updates = itertools.count()
+
+    def update():
+        # Fresh objects with values that differ from the last update
+        snapshot = replace(snapshots[next(updates) % 2])
+        coordinator.async_set_updated_data({"12345": snapshot})
+
+    with count_property_reads() as reads:
+        update()
+    benchmark.extra_info["entities"] = len(hass.states.async_all())
+    benchmark.extra_info["property_reads_per_update"] = reads.total()
+    benchmark.extra_info["property_reads"] = dict(reads.most_common())
+    benchmark.extra_info["state_writes_per_update"] = coordinator.writes_emitted
+
+    benchmark(update)
+
+    domains = {state.domain for state in hass.states.async_all()}
+    assert domains == set(PLATFORMS)
+
+
+def test_refresh_event_loop_time(hass: HomeAssistant, benchmark):
+    """Benchmark the event loop time of one refresh including the entity updates."""
+    responses = [create_co2_response(650.0 + index) for index in range(ROUNDS + 1)]
+    entry = hass.loop.run_until_complete(
+        setup_integration(hass, create_mock_session(device_response=responses))
+    )
+    coordinator = entry.runtime_data
+    loop_seconds = []
+
+    def refresh():
+        # The mocked API answers at once, so all time is spent on the loop
+        start = time.thread_time()
+        hass.loop.run_until_complete(coordinator.async_refresh())
+        loop_seconds.append(time.thread_time() - start)
+
+    benchmark.pedantic(refresh, rounds=ROUNDS)
+
+    benchmark.extra_info["loop_seconds_per_refresh"] = sum(loop_seconds) / len(
+        loop_seconds
+    )
+    assert coordinator.last_update_success
@@ -6,17 +6,39 @@ from unittest.mock import patch
 from homeassistant import config_entries
 from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
-from custom_components.jablotron_futura.const import DOMAIN
+from custom_components.jablotron_futura.const import (
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MAX_STATE_AGE,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_PASSWORD,
+    CONF_SERVICE_ID,
+    CONF_SERVICE_TYPE,
+    CONF_STALENESS_BUDGET,
+    DOMAIN,
+)
 
-from .conftest import MOCK_CONFIG, create_mock_session
+from .conftest import (
+    MOCK_CONFIG,
+    MOCK_DEVICE_RESPONSE,
+    MOCK_SECOND_SERVICE_LIST_RESPONSE,
+    create_device_response,
+    create_mock_session,
+    setup_integration,
+)
 
 
-async def test_config_flow_shows_form(hass: HomeAssistant):
-    """Test that the config flow shows the user form initially."""
-    result = await hass.config_entries.flow.async_init(
+async def start_flow(hass: HomeAssistant):
+    """Start a user flow."""
+    return await hass.config_entries.flow.async_init(
         DOMAIN, context={"source": config_entries.SOURCE_USER}
     )
+
+
+async def test_config_flow_shows_form(hass: HomeAssistant):
+    """Test that the config flow shows the user form initially."""
+    result = await start_flow(hass)
     assert result["type"] == FlowResultType.FORM
     assert result["step_id"] == "user"
 
@@ -26,12 +48,10 @@ async def test_config_flow_success(hass: HomeAssistant):
     mock_session = create_mock_session()
 
     with patch(
-        "custom_components.jablotron_futura.futura.aiohttp_client.async_get_clientsession",
+        "custom_components.jablotron_futura.cloud.async_create_session",
         return_value=mock_session,
     ):
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
-        )
+        result = await start_flow(hass)
 
         result = await hass.config_entries.flow.async_configure(
             result["flow_id"],
@@ -39,7 +59,115 @@ async def test_config_flow_success(hass: HomeAssistant):
         )
         assert result["type"] == FlowResultType.CREATE_ENTRY
         assert result["title"] == "Futura 2"
-        assert result["data"] == MOCK_CONFIG
+        assert result["data"] == MOCK_CONFIG | {
+            CONF_SERVICE_ID: "12345",
+            CONF_SERVICE_TYPE: "futura2",
+        }
+
+    # The flow only discovers; the entry setup fetches the device without
+    # listing the services again
+    endpoints = [endpoint for endpoint, _ in mock_session.calls]
+    assert endpoints[:3] == [
+        "userAuthorize.json",
+        "serviceListGet.json",
+        "userAuthorize.json",
+    ]
+    assert endpoints.count("serviceListGet.json") == 1
+
+
+async def test_config_flow_multiple_units(hass: HomeAssistant):
+    """Test that the unit is picked when the account has more than one."""
+    mock_session = create_mock_session(
+        service_list_response=MOCK_SECOND_SERVICE_LIST_RESPONSE,
+        devices={
+            "12345": MOCK_DEVICE_RESPONSE,
+            "67890": create_device_response("67890", "SN987654321"),
+        },
+    )
+
+    with patch(
+        "custom_components.jablotron_futura.cloud.async_create_session",
+        return_value=mock_session,
+    ):
+        result = await start_flow(hass)
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            MOCK_CONFIG,
+        )
+        assert result["type"] == FlowResultType.FORM
+        assert result["step_id"] == "unit"
+
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            {CONF_SERVICE_ID: "67890"},
+        )
+        assert result["type"] == FlowResultType.CREATE_ENTRY
+        assert result["title"] == "Futura 2 Garage"
+        assert result["data"] == MOCK_CONFIG | {
+            CONF_SERVICE_ID: "67890",
+            CONF_SERVICE_TYPE: "futura2",
+        }
+
+
+async def test_reauth_flow(hass: HomeAssistant):
+    """Test that a new password is validated and stored on reauth."""
+    entry = await setup_integration(hass)
+
+    result = await entry.start_reauth_flow(hass)
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "reauth_confirm"
+
+    with patch(
+        "custom_components.jablotron_futura.cloud.async_create_session",
+        return_value=create_mock_session(),
+    ):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_PASSWORD: "newpassword"}
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "reauth_successful"
+    assert entry.data[CONF_PASSWORD] == "newpassword"
+
+
+async def test_reauth_updates_account_entries(hass: HomeAssistant):
+    """Test that reauth stores the new password in every entry of the account."""
+    mock_session = create_mock_session(
+        service_list_response=MOCK_SECOND_SERVICE_LIST_RESPONSE,
+        devices={
+            "12345": MOCK_DEVICE_RESPONSE,
+            "67890": create_device_response("67890", "SN987654321"),
+        },
+    )
+    entries = [
+        MockConfigEntry(
+            domain=DOMAIN,
+            title="Futura 2",
+            data=MOCK_CONFIG | {CONF_SERVICE_ID: service_id},
+            unique_id=service_id,
+        )
+        for service_id in ("12345", "67890")
+    ]
+    with patch(
+        "custom_components.jablotron_futura.cloud.async_create_session",
+        return_value=mock_session,
+    ):
+        for entry in entries:
+            entry.add_to_hass(hass)
+            await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+
+        result = await entries[0].start_reauth_flow(hass)
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_PASSWORD: "newpassword"}
+        )
+        await hass.async_block_till_done()
+
+    assert result["reason"] == "reauth_successful"
+    assert [entry.data[CONF_PASSWORD] for entry in entries] == ["newpassword"] * 2
+    first, second = (entry.runtime_data for entry in entries)
+    assert first.futura is second.futura
 
 
 async def test_config_flow_invalid_auth(hass: HomeAssistant):
@@ -47,12 +175,10 @@ async def test_config_flow_invalid_auth(hass: HomeAssistant):
     mock_session = create_mock_session(auth_status=401)
 
     with patch(
-        "custom_components.jablotron_futura.futura.aiohttp_client.async_get_clientsession",
+        "custom_components.jablotron_futura.cloud.async_create_session",
         return_value=mock_session,
     ):
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
-        )
+        result = await start_flow(hass)
 
         result = await hass.config_entries.flow.async_configure(
             result["flow_id"],
@@ -67,12 +193,10 @@ async def test_config_flow_api_error(hass: HomeAssistant):
     mock_session = create_mock_session(auth_status=500)
 
     with patch(
-        "custom_components.jablotron_futura.futura.aiohttp_client.async_get_clientsession",
+        "custom_components.jablotron_futura.cloud.async_create_session",
         return_value=mock_session,
     ):
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
-        )
+        result = await start_flow(hass)
 
         result = await hass.config_entries.flow.async_configure(
             result["flow_id"],
@@ -80,3 +204,54 @@ async def test_config_flow_api_error(hass: HomeAssistant):
         )
         assert result["type"] == FlowResultType.FORM
         assert result["errors"] == {"base": "unknown"}
+
+
+async def test_options_flow(hass: HomeAssistant):
+    """Test that polling and sensor filters can be changed in the options flow."""
+    entry = await setup_integration(hass)
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "init"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {
+            CONF_MIN_SCAN_INTERVAL: 600,
+            CONF_MAX_SCAN_INTERVAL: 60,
+            CONF_STALENESS_BUDGET: 10,
+        },
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "invalid_scan_interval"}
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {
+            CONF_MIN_SCAN_INTERVAL: 30,
+            CONF_MAX_SCAN_INTERVAL: 900,
+            CONF_STALENESS_BUDGET: 10,
+        },
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "sensors"
+
+    sensors = {
+        str(marker): marker.description["suggested_value"]
+        for marker in result["data_schema"].schema
+    }
+    assert sensors[CONF_MAX_STATE_AGE] == 3600
+    assert sensors["fut_temp_indoor_deadband"] == 0.1
+    sensors["fut_temp_indoor_deadband"] = 0.3
+    sensors["fut_co2_ppm_max_precision"] = 1
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], sensors
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert entry.options == {
+        CONF_MIN_SCAN_INTERVAL: 30,
+        CONF_MAX_SCAN_INTERVAL: 900,
+        CONF_STALENESS_BUDGET: 10,
+    } | sensors
+    assert entry.options["fut_temp_indoor_deadband"] == 0.3
@@ -0,0 +1,37 @@
+"""Tests for the Jablotron Futura diagnostics."""
+from __future__ import annotations
+
+import json
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.components.diagnostics import (
+    get_diagnostics_for_config_entry,
+)
+
+from .conftest import MOCK_PASSWORD, MOCK_USERNAME, setup_integration
+
+
+async def test_diagnostics(hass: HomeAssistant, hass_client):
+    """Test that diagnostics hold phase timings and counters, redacted."""
+    entry = await setup_integration(hass)
+
+    diagnostics = await get_diagnostics_for_config_entry(hass, hass_client, entry)
+
+    phases = diagnostics["metrics"]["phases"]
+    assert {"userAuthorize", "serviceListGet", "getDevice", "json_decode"} <= set(
+        phases
+    )
+    assert {"parse", "sync", "fan_out"} <= set(phases)
+    assert phases["getDevice"]["count"] == 1
+    assert phases["getDevice"]["p50_ms"] <= phases["getDevice"]["max_ms"]
+    counters = diagnostics["metrics"]["counters"]
+    assert counters["requests"] == 3
+    assert counters["response_bytes"] > 0
+    assert diagnostics["coordinator"]["last_update_success"] is True
+    assert diagnostics["units"][0]["device"]["summary"]["filter_health"] == 85
+
+    dump = json.dumps(diagnostics)
+    for secret in (MOCK_USERNAME, MOCK_PASSWORD, "SN123456789"):
+        assert secret not in dump
+    assert diagnostics["entry"]["data"]["password"] == "**REDACTED**"
+
@@ -0,0 +1,431 @@
+"""Tests for the Jablotron Futura API client."""
+from __future__ import annotations
+
+import asyncio
+from copy import deepcopy
+from http.cookies import SimpleCookie
+
+import aiohttp
+import pytest
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import HomeAssistant
+
+from custom_components.jablotron_futura.cloud import FuturaSession
+from custom_components.jablotron_futura.const import (
+    JABLOTRON_SESSION_COOKIE,
+    JABLOTRON_SESSION_LIFETIME,
+)
+from custom_components.jablotron_futura.errors import (
+    ApiAuthError,
+    ApiUnavailableError,
+    InvalidPayloadError,
+    ServiceNotFoundError,
+)
+from custom_components.jablotron_futura.futura import Futura, FuturaTransport
+
+from .conftest import (
+    MOCK_CONFIG,
+    MOCK_DEVICE_RESPONSE,
+    MOCK_SECOND_SERVICE_LIST_RESPONSE,
+    MOCK_SERVICE_LIST_RESPONSE,
+    create_device_response,
+    create_futura,
+    create_mock_session,
+)
+
+
+def endpoints(mock_session) -> list[str]:
+    return [endpoint for endpoint, _ in mock_session.calls]
+
+
+async def test_session_reused_between_syncs(hass: HomeAssistant):
+    """Test that consecutive syncs and writes authorize only once."""
+    mock_session = create_mock_session()
+    futura = create_futura(hass, mock_session)
+
+    await futura.sync()
+    await futura.set_control("12345", "temperature", 21.5)
+    await futura.sync()
+
+    assert endpoints(mock_session).count("userAuthorize.json") == 1
+
+
+async def test_session_renewed_after_rejection(hass: HomeAssistant):
+    """Test that a rejected session is renewed and the request retried once."""
+    mock_session = create_mock_session(device_status=[200, 401, 200])
+    futura = create_futura(hass, mock_session)
+
+    await futura.sync()
+    await futura.sync()
+
+    assert endpoints(mock_session)[-3:] == [
+        "getDevice.json",
+        "userAuthorize.json",
+        "getDevice.json",
+    ]
+
+
+async def test_session_rejected_twice_raises_auth_error(hass: HomeAssistant):
+    """Test that a session rejected right after renewal is an auth error."""
+    mock_session = create_mock_session(device_status=403)
+    futura = create_futura(hass, mock_session)
+
+    with pytest.raises(ApiAuthError):
+        await futura.sync()
+
+
+async def test_service_discovered_once(hass: HomeAssistant):
+    """Test that the service list is not fetched again on later syncs."""
+    mock_session = create_mock_session()
+    futura = create_futura(hass, mock_session)
+
+    await futura.sync()
+    await futura.sync()
+
+    assert endpoints(mock_session).count("serviceListGet.json") == 1
+    assert endpoints(mock_session).count("getDevice.json") == 2
+
+
+async def test_service_rediscovered_when_not_found(hass: HomeAssistant):
+    """Test that the service list is fetched again when the device is gone."""
+    mock_session = create_mock_session(device_status=[200, 404, 200])
+    futura = create_futura(hass, mock_session)
+
+    await futura.sync()
+    await futura.sync()
+
+    assert endpoints(mock_session)[-3:] == [
+        "getDevice.json",
+        "serviceListGet.json",
+        "getDevice.json",
+    ]
+
+
+async def test_services_kept_when_rediscovery_fails(hass: HomeAssistant):
+    """Test that a failed rediscovery keeps the known services writable."""
+    service_list = deepcopy(MOCK_SERVICE_LIST_RESPONSE)
+    mock_session = create_mock_session(
+        service_list_response=service_list, device_status=[200, 404]
+    )
+    futura = create_futura(hass, mock_session)
+    await futura.sync()
+
+    service_list["data"]["services"] = []
+    with pytest.raises(ServiceNotFoundError):
+        await futura.sync()
+    await futura.set_control("12345", "fan_power", 3)
+    with pytest.raises(ServiceNotFoundError):
+        await futura.set_control("99999", "fan_power", 3)
+
+    assert endpoints(mock_session)[-1] == "setDevice.json"
+
+
+async def test_unchanged_device_checksum(hass: HomeAssistant):
+    """Test that the last checksum is sent back and reused when unchanged."""
+    mock_session = create_mock_session(
+        device_response=[
+            MOCK_DEVICE_RESPONSE | {"checksum": "abc"},
+            {"checksum": "abc"},
+        ]
+    )
+    futura = create_futura(hass, mock_session)
+
+    first = await futura.sync()
+    second = await futura.sync()
+
+    assert second["12345"] is first["12345"]
+    device_requests = [
+        payload
+        for endpoint, payload in mock_session.calls
+        if endpoint == "getDevice.json"
+    ]
+    assert [payload["checksum"] for payload in device_requests] == ["", "abc"]
+
+
+async def test_malformed_device_rejected(hass: HomeAssistant):
+    """Test that a device document without required fields is rejected."""
+    device_response = deepcopy(MOCK_DEVICE_RESPONSE)
+    del device_response["device"]["data"]["controls"][0]["extended_properties"]
+    futura = create_futura(hass, create_mock_session(device_response=device_response))
+
+    with pytest.raises(InvalidPayloadError):
+        await futura.sync()
+
+
+@pytest.mark.parametrize(
+    ("field", "value"), [("rooms", []), ("details", None), ("type", "missing")]
+)
+async def test_malformed_central_unit_rejected(
+    hass: HomeAssistant, field: str, value
+):
+    """Test that a device document with a malformed central unit is rejected."""
+    device_response = deepcopy(MOCK_DEVICE_RESPONSE)
+    if value == "missing":
+        del device_response["device"][field]
+    else:
+        device_response["device"][field] = value
+    futura = create_futura(hass, create_mock_session(device_response=device_response))
+
+    with pytest.raises(InvalidPayloadError):
+        await futura.sync()
+
+
+async def test_malformed_service_list_rejected(hass: HomeAssistant):
+    """Test that a service list without services is rejected."""
+    futura = create_futura(
+        hass, create_mock_session(service_list_response={"data": None})
+    )
+
+    with pytest.raises(InvalidPayloadError):
+        await futura.sync()
+
+
+async def test_concurrent_writes_coalesced(hass: HomeAssistant):
+    """Test that concurrent writes are merged into one request per kind."""
+    mock_session = create_mock_session()
+    futura = create_futura(hass, mock_session)
+    await futura.sync()
+
+    await asyncio.gather(
+        futura.set_control("12345", "fan_power", 2),
+        futura.set_control("12345", "temperature", 21.0),
+        futura.set_control("12345", "temperature", 21.5),
+        futura.set_setting_extended_property("12345", "bypass", "enabled"),
+    )
+
+    writes = [
+        payload["device"]
+        for endpoint, payload in mock_session.calls
+        if endpoint == "setDevice.json"
+    ]
+    assert len(writes) == 2
+    assert writes[0]["control"][0]["manual"] == {"fan_power": 2, "temperature": 21.5}
+    assert writes[1]["settings"] == {"extended_properties": {"bypass": "enabled"}}
+
+
+async def test_multiple_units_fetched(hass: HomeAssistant):
+    """Test that every enabled Futura service is fetched."""
+    mock_session = create_mock_session(
+        service_list_response=MOCK_SECOND_SERVICE_LIST_RESPONSE,
+        devices={
+            "12345": MOCK_DEVICE_RESPONSE,
+            "67890": create_device_response("67890", "SN987654321"),
+        },
+    )
+    futura = create_futura(hass, mock_session)
+
+    snapshots = await futura.sync()
+
+    assert list(snapshots) == ["12345", "67890"]
+    assert [unit.serial_no for unit in futura.central_units().values()] == [
+        "SN123456789",
+        "SN987654321",
+    ]
+    assert endpoints(mock_session).count("userAuthorize.json") == 1
+
+
+async def test_concurrent_logins_shared(hass: HomeAssistant):
+    """Test that concurrent callers of authorize() share one login."""
+    mock_session = create_mock_session()
+    futura = create_futura(hass, mock_session)
+
+    await asyncio.gather(
+        futura.transport.authorize(),
+        futura.transport.authorize(),
+        futura.transport.authorize(),
+    )
+
+    assert endpoints(mock_session) == ["userAuthorize.json"]
+
+
+async def test_concurrent_rejections_renew_session_once(hass: HomeAssistant):
+    """Test that requests rejected with the same session log in once."""
+    mock_session = create_mock_session(
+        service_list_response=MOCK_SECOND_SERVICE_LIST_RESPONSE,
+        device_status=[401, 401, 200, 200],
+        devices={
+            "12345": MOCK_DEVICE_RESPONSE,
+            "67890": create_device_response("67890", "SN987654321"),
+        },
+    )
+    futura = create_futura(hass, mock_session)
+
+    await futura.sync()
+
+    assert endpoints(mock_session).count("userAuthorize.json") == 2
+    assert endpoints(mock_session).count("getDevice.json") == 4
+
+
+async def test_concurrent_syncs_shared(hass: HomeAssistant):
+    """Test that concurrent callers of sync() share one fetch."""
+    mock_session = create_mock_session()
+    futura = create_futura(hass, mock_session)
+
+    results = await asyncio.gather(futura.sync(), futura.sync(), futura.sync())
+
+    assert endpoints(mock_session) == [
+        "userAuthorize.json",
+        "serviceListGet.json",
+        "getDevice.json",
+    ]
+    assert results[0] is results[1] is results[2]
+
+
+async def test_sync_after_write_not_shared(hass: HomeAssistant):
+    """Test that a sync running when a write was sent is not reused."""
+    gate = asyncio.Event()
+    gate.set()
+    mock_session = create_mock_session(device_gate=gate)
+    futura = create_futura(hass, mock_session)
+    await futura.sync()
+
+    gate.clear()
+    running = hass.async_create_task(futura.sync())
+    await futura.set_control("12345", "temperature", 21.5)
+    read_back = hass.async_create_task(futura.sync())
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(running, read_back)
+
+    assert endpoints(mock_session)[-3:] == [
+        "getDevice.json",
+        "setDevice.json",
+        "getDevice.json",
+    ]
+    assert running.result() is not read_back.result()
+
+
+async def test_transient_failures_retried(hass: HomeAssistant):
+    """Test that failed device reads are retried before the sync fails."""
+    mock_session = create_mock_session(
+        device_status=[503, aiohttp.ClientConnectionError(), 200]
+    )
+    futura = create_futura(hass, mock_session)
+
+    snapshots = await futura.sync()
+
+    assert list(snapshots) == ["12345"]
+    assert endpoints(mock_session).count("getDevice.json") == 3
+    counters = futura.metrics.counters
+    assert (counters["retries"], counters["failures"]) == (2, 2)
+    assert futura.metrics.phases["getDevice"].count == 3
+
+
+async def test_writes_not_retried(hass: HomeAssistant):
+    """Test that a failed setDevice is not sent again."""
+    mock_session = create_mock_session(set_device_status=503)
+    futura = create_futura(hass, mock_session)
+    await futura.sync()
+
+    with pytest.raises(ApiUnavailableError):
+        await futura.set_control("12345", "temperature", 21.5)
+
+    assert endpoints(mock_session).count("setDevice.json") == 1
+
+
+async def test_retry_after_honored(hass: HomeAssistant):
+    """Test that a long Retry-After fails the sync and blocks further requests."""
+    mock_session = create_mock_session(
+        device_status=429, device_headers={"Retry-After": "120"}
+    )
+    futura = create_futura(hass, mock_session)
+
+    with pytest.raises(ApiUnavailableError) as err:
+        await futura.sync()
+    assert err.value.retry_after == pytest.approx(120, abs=1)
+
+    with pytest.raises(ApiUnavailableError):
+        await futura.sync()
+    assert endpoints(mock_session).count("getDevice.json") == 1
+
+
+async def test_circuit_opens_after_repeated_failures(hass: HomeAssistant):
+    """Test that the breaker stops requests until its cool-down passed."""
+    mock_session = create_mock_session(device_status=500)
+    futura = create_futura(hass, mock_session)
+
+    for _ in range(2):
+        with pytest.raises(ApiUnavailableError):
+            await futura.sync()
+    calls = len(mock_session.calls)
+    with pytest.raises(ApiUnavailableError) as err:
+        await futura.sync()
+
+    assert len(mock_session.calls) == calls
+    assert err.value.retry_after == pytest.approx(60, abs=1)
+
+
+async def test_connection_reused(hass: HomeAssistant, fake_cloud):
+    """Test that requests of an account share one compressed connection."""
+    futura = Futura.from_config(hass, MOCK_CONFIG)
+
+    await futura.prewarm()
+    for _ in range(3):
+        await futura.sync()
+    await futura.close()
+
+    assert [endpoint for endpoint, _ in fake_cloud.requests] == [
+        "userAuthorize.json",
+        "serviceListGet.json",
+        *["getDevice.json"] * 3,
+    ]
+    assert len(fake_cloud.connections) == 1
+    assert all(
+        "gzip" in headers["Accept-Encoding"] for _, headers in fake_cloud.requests
+    )
+    assert futura.central_unit("12345").serial_no == "SN123456789"
+
+
+async def test_session_closed_when_home_assistant_stops(
+    hass: HomeAssistant, fake_cloud
+):
+    """Test that the account session is closed when Home Assistant stops."""
+    futura = Futura.from_config(hass, MOCK_CONFIG)
+    await futura.sync()
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE)
+    await hass.async_block_till_done()
+
+    assert futura.transport._session.closed
+    await futura.close()
+
+
+def test_transport_requires_overrides():
+    """Test that a transport missing an operation cannot be created."""
+
+    class ReadOnlyTransport(FuturaTransport):
+        async def discover(self):
+            return {}
+
+        async def fetch(self, service):
+            return service.snapshot
+
+    with pytest.raises(TypeError, match="write"):
+        ReadOnlyTransport()
+
+
+def test_session_lifetime_kept_after_one_rejection():
+    """Test that only repeated early rejections shorten the session lifetime."""
+    cookies = SimpleCookie({JABLOTRON_SESSION_COOKIE: "token"})
+    session = FuturaSession()
+
+    session.start(cookies)
+    session.authorized_at -= 30
+    session.expire()
+    session.start(cookies)
+    session.authorized_at -= 120
+    assert session.lifetime == JABLOTRON_SESSION_LIFETIME
+    assert session.valid
+
+    # The session lasted its lifetime, the next rejection counts anew
+    session.authorized_at -= JABLOTRON_SESSION_LIFETIME
+    session.start(cookies)
+    session.authorized_at -= 30
+    session.expire()
+    assert session.lifetime == JABLOTRON_SESSION_LIFETIME
+
+    session.start(cookies)
+    session.authorized_at -= 300
+    session.expire()
+    assert session.lifetime == pytest.approx(270, abs=1)
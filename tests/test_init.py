@@ -1,12 +1,36 @@
 """Tests for the Jablotron Futura integration setup."""
 from __future__ import annotations
 
+import asyncio
+from datetime import timedelta
 from unittest.mock import patch
 
+from freezegun.api import FrozenDateTimeFactory
 from homeassistant.config_entries import ConfigEntryState
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
 
-from .conftest import create_mock_session, setup_integration
+from custom_components.jablotron_futura.const import (
+    CONF_SERVICE_ID,
+    CONF_STALENESS_BUDGET,
+    DOMAIN,
+)
+
+from .conftest import (
+    MOCK_CONFIG,
+    MOCK_DEVICE_RESPONSE,
+    MOCK_SECOND_SERVICE_LIST_RESPONSE,
+    create_device_response,
+    create_futura,
+    create_mock_entry,
+    create_mock_session,
+    setup_integration,
+)
 
 
 async def test_setup_entry(hass: HomeAssistant):
@@ -32,9 +56,253 @@ async def test_unload_entry(hass: HomeAssistant):
     assert entry.state == ConfigEntryState.LOADED
 
     with patch(
-        "custom_components.jablotron_futura.futura.aiohttp_client.async_get_clientsession",
+        "custom_components.jablotron_futura.cloud.async_create_session",
     ):
         await hass.config_entries.async_unload(entry.entry_id)
         await hass.async_block_till_done()
 
     assert entry.state == ConfigEntryState.NOT_LOADED
+
+
+async def test_setup_entry_multiple_units(hass: HomeAssistant):
+    """Test that entities are created for every Futura unit."""
+    mock_session = create_mock_session(
+        service_list_response=MOCK_SECOND_SERVICE_LIST_RESPONSE,
+        devices={
+            "12345": MOCK_DEVICE_RESPONSE,
+            "67890": create_device_response("67890", "SN987654321"),
+        },
+    )
+    await setup_integration(hass, mock_session)
+
+    entity_registry = er.async_get(hass)
+    assert entity_registry.async_get_entity_id(
+        "sensor", DOMAIN, "SN123456789_filter_health"
+    )
+    assert entity_registry.async_get_entity_id(
+        "sensor", DOMAIN, "SN987654321_filter_health"
+    )
+    state = hass.states.get("sensor.jablotron_futura_sn987654321_filter_health")
+    assert state is not None
+    assert state.state == "85"
+
+
+async def test_setup_entry_migrates_unique_ids(hass: HomeAssistant):
+    """Test that bare unique ids from single-unit versions are namespaced."""
+    entry = create_mock_entry()
+    entry.add_to_hass(hass)
+    entity_registry = er.async_get(hass)
+    entity_registry.async_get_or_create(
+        "sensor",
+        DOMAIN,
+        "filter_health",
+        config_entry=entry,
+        suggested_object_id="jablotron_futura_filter_health",
+    )
+
+    with patch(
+        "custom_components.jablotron_futura.cloud.async_create_session",
+        return_value=create_mock_session(),
+    ):
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    entity_id = entity_registry.async_get_entity_id(
+        "sensor", DOMAIN, "SN123456789_filter_health"
+    )
+    assert entity_id == "sensor.jablotron_futura_filter_health"
+
+
+async def test_entries_share_account_client(hass: HomeAssistant):
+    """Test that entries of one account share a client and one login."""
+    mock_session = create_mock_session(
+        service_list_response=MOCK_SECOND_SERVICE_LIST_RESPONSE,
+        devices={
+            "12345": MOCK_DEVICE_RESPONSE,
+            "67890": create_device_response("67890", "SN987654321"),
+        },
+    )
+    entries = [
+        MockConfigEntry(
+            domain=DOMAIN,
+            title="Futura 2",
+            data=MOCK_CONFIG | {CONF_SERVICE_ID: service_id},
+            unique_id=service_id,
+        )
+        for service_id in ("12345", "67890")
+    ]
+
+    with patch(
+        "custom_components.jablotron_futura.cloud.async_create_session",
+        return_value=mock_session,
+    ):
+        for entry in entries:
+            entry.add_to_hass(hass)
+            await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+
+    first, second = (entry.runtime_data for entry in entries)
+    assert first.futura is second.futura
+    assert list(first.data) == ["12345"]
+    assert list(second.data) == ["67890"]
+    endpoints = [endpoint for endpoint, _ in mock_session.calls]
+    assert endpoints.count("userAuthorize.json") == 1
+    assert endpoints.count("serviceListGet.json") == 0
+
+    await hass.config_entries.async_unload(entries[0].entry_id)
+    [account] = hass.data[DOMAIN].values()
+    assert second.futura is account.futura
+    await hass.config_entries.async_unload(entries[1].entry_id)
+    assert not hass.data[DOMAIN]
+
+
+async def test_refreshes_fold_into_trailing_refresh(hass: HomeAssistant):
+    """Test that refreshes requested during a refresh run once afterwards."""
+    gate = asyncio.Event()
+    gate.set()
+    mock_session = create_mock_session(device_gate=gate)
+    entry = await setup_integration(hass, mock_session)
+    coordinator = entry.runtime_data
+    mock_session.calls.clear()
+
+    gate.clear()
+    running = hass.async_create_task(coordinator.async_refresh())
+    await asyncio.sleep(0)
+    requested = [
+        hass.async_create_task(coordinator.async_refresh()) for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(running, *requested)
+
+    assert [endpoint for endpoint, _ in mock_session.calls] == [
+        "getDevice.json",
+        "getDevice.json",
+    ]
+
+
+async def test_scheduled_poll_joins_running_refresh(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+):
+    """Test that a poll coming due during a refresh shares it."""
+    gate = asyncio.Event()
+    gate.set()
+    mock_session = create_mock_session(device_gate=gate)
+    entry = await setup_integration(hass, mock_session)
+    coordinator = entry.runtime_data
+    mock_session.calls.clear()
+
+    gate.clear()
+    running = hass.async_create_task(coordinator.async_refresh())
+    await asyncio.sleep(0)
+    # The refresh cancelled the poll timer, start it again to fire meanwhile
+    coordinator._schedule_refresh()
+    freezer.tick(coordinator.update_interval)
+    async_fire_time_changed(hass)
+    await asyncio.sleep(0)
+    gate.set()
+    await running
+    await hass.async_block_till_done()
+
+    assert [endpoint for endpoint, _ in mock_session.calls] == ["getDevice.json"]
+
+
+async def test_snapshot_saved(hass: HomeAssistant, hass_storage):
+    """Test that the last snapshot is stored after a refresh."""
+    entry = await setup_integration(hass)
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(minutes=2))
+    await hass.async_block_till_done()
+
+    stored = hass_storage["{}.{}".format(DOMAIN, entry.entry_id)]["data"]
+    assert stored["units"]["12345"]["central_unit"]["serial_no"] == "SN123456789"
+    assert dt_util.parse_datetime(stored["updated_at"]) is not None
+
+
+async def test_setup_entry_restores_snapshot(hass: HomeAssistant, hass_storage):
+    """Test that a stored snapshot is served while the cloud is down."""
+    futura = create_futura(hass, create_mock_session())
+    await futura.sync()
+    entry = create_mock_entry()
+    hass_storage["{}.{}".format(DOMAIN, entry.entry_id)] = {
+        "version": 1,
+        "key": "{}.{}".format(DOMAIN, entry.entry_id),
+        "data": {"units": futura.dump(["12345"])},
+    }
+
+    await setup_integration(hass, create_mock_session(auth_status=500), entry)
+
+    assert entry.state == ConfigEntryState.LOADED
+    state = hass.states.get("sensor.jablotron_futura_filter_health")
+    assert state.state == "85"
+    assert state.attributes["stale"] is True
+
+
+async def test_last_snapshot_served_within_staleness_budget(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+):
+    """Test that entities outlast failed refreshes only for the budget."""
+    statuses = [200]
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Futura 2",
+        data=MOCK_CONFIG,
+        options={CONF_STALENESS_BUDGET: 10},
+    )
+    await setup_integration(hass, create_mock_session(device_status=statuses), entry)
+    coordinator = entry.runtime_data
+    updated_at = dt_util.utcnow().isoformat()
+
+    statuses[:] = [400] * 5
+    freezer.tick(timedelta(minutes=1))
+    await coordinator.async_refresh()
+
+    state = hass.states.get("sensor.jablotron_futura_filter_health")
+    assert state.state == "85"
+    assert state.attributes["stale"] is True
+    assert state.attributes["last_updated_from_cloud"] == updated_at
+
+    freezer.tick(timedelta(minutes=10))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.jablotron_futura_filter_health").state == (
+        "unavailable"
+    )
+
+    statuses[:] = [200] * 5
+    await coordinator.async_refresh()
+
+    state = hass.states.get("sensor.jablotron_futura_filter_health")
+    assert state.state == "85"
+    assert "stale" not in state.attributes
+    assert entry.state == ConfigEntryState.LOADED
+
+
+async def test_auth_failure_expires_entities(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+):
+    """Test that the staleness budget also runs out after an auth failure."""
+    statuses = [200]
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Futura 2",
+        data=MOCK_CONFIG,
+        options={CONF_STALENESS_BUDGET: 1},
+    )
+    await setup_integration(hass, create_mock_session(device_status=statuses), entry)
+    coordinator = entry.runtime_data
+
+    statuses[:] = [401] * 5
+    await coordinator.async_refresh()
+
+    assert coordinator.failing_since is not None
+    assert hass.states.get("sensor.jablotron_futura_filter_health").state == "85"
+
+    freezer.tick(timedelta(minutes=2))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.jablotron_futura_filter_health").state == (
+        "unavailable"
+    )
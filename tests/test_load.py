@@ -0,0 +1,128 @@
+"""End-to-end tests against the local Jablotron cloud stand-in."""
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import time
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.jablotron_futura.futura import Futura
+
+from .conftest import MOCK_CONFIG, MOCK_DEVICE_RESPONSE, create_mock_entry
+
+LATENCY = 0.1
+
+
+def add_units(fake_cloud, count: int) -> None:
+    for index in range(1, count):
+        unit = fake_cloud.add_unit(
+            str(12345 + index),
+            MOCK_DEVICE_RESPONSE["device"],
+            "Futura {}".format(index),
+        )
+        unit.device["details"]["serial_no"] = "SN{}".format(123456789 + index)
+
+
+async def setup_cloud_entry(hass: HomeAssistant):
+    entry = create_mock_entry()
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def test_units_fetched_concurrently(hass: HomeAssistant, fake_cloud):
+    """Test that a sync of many units costs about two round trips of fetches."""
+    add_units(fake_cloud, 5)
+    fake_cloud.latency = LATENCY
+    futura = Futura.from_config(hass, MOCK_CONFIG)
+
+    start = time.perf_counter()
+    snapshots = await futura.sync()
+    elapsed = time.perf_counter() - start
+    await futura.close()
+
+    assert len(snapshots) == 5
+    # Login, service list and two rounds of four parallel fetches; one
+    # request after the other would take seven round trips
+    assert elapsed < 6 * LATENCY
+
+
+async def test_writes_change_cloud_state(hass: HomeAssistant, fake_cloud):
+    """Test that writes reach the unit and the checksum reports the change."""
+    futura = Futura.from_config(hass, MOCK_CONFIG)
+    first = (await futura.sync())["12345"]
+    assert (await futura.sync())["12345"] is first
+
+    await asyncio.gather(
+        futura.set_control("12345", "temperature", 21.5),
+        futura.set_setting_extended_property("12345", "bypass", "disabled"),
+    )
+    snapshot = (await futura.sync())["12345"]
+    await futura.close()
+
+    assert fake_cloud.endpoints().count("setDevice.json") == 2
+    assert fake_cloud.units["12345"].control("control_temperature") == 21.5
+    assert snapshot.controls["control_temperature"].value == 21.5
+    assert snapshot.settings.bypass == "disabled"
+
+
+async def test_expired_session_renewed(hass: HomeAssistant, fake_cloud):
+    """Test that a session dropped by the cloud is renewed transparently."""
+    futura = Futura.from_config(hass, MOCK_CONFIG)
+    await futura.sync()
+
+    fake_cloud.expire_sessions()
+    await futura.sync()
+    await futura.close()
+
+    assert fake_cloud.endpoints()[-3:] == [
+        "getDevice.json",
+        "userAuthorize.json",
+        "getDevice.json",
+    ]
+
+
+async def test_concurrent_refreshes_fold(hass: HomeAssistant, fake_cloud):
+    """Test that a burst of refresh requests results in at most two polls."""
+    add_units(fake_cloud, 3)
+    fake_cloud.latency = LATENCY
+    entry = await setup_cloud_entry(hass)
+    coordinator = entry.runtime_data
+    fake_cloud.requests.clear()
+
+    await asyncio.gather(*(coordinator.async_refresh() for _ in range(50)))
+
+    assert fake_cloud.endpoints().count("getDevice.json") <= 2 * 3
+    assert coordinator.last_update_success
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_flaky_cloud_keeps_entities(hass: HomeAssistant, fake_cloud):
+    """Test that entities ride out a cloud failing a third of its requests."""
+    entry = await setup_cloud_entry(hass)
+    coordinator = entry.runtime_data
+    fake_cloud.error_rate = 0.3
+
+    for _ in range(20):
+        await coordinator.async_refresh()
+        state = hass.states.get("sensor.jablotron_futura_filter_health")
+        assert state.state == "85"
+
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_rate_limited_poll_waits(hass: HomeAssistant, fake_cloud):
+    """Test that a 429 pushes the next poll out by its Retry-After."""
+    entry = await setup_cloud_entry(hass)
+    coordinator = entry.runtime_data
+    fake_cloud.fail("getDevice.json", 429, retry_after=600)
+    fake_cloud.requests.clear()
+
+    await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    assert fake_cloud.endpoints() == ["getDevice.json"]
+    assert coordinator.update_interval >= timedelta(seconds=599)
+    await hass.config_entries.async_unload(entry.entry_id)
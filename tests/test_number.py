@@ -1,9 +1,14 @@
 """Tests for the Jablotron Futura number platform."""
 from __future__ import annotations
 
+import asyncio
+from datetime import timedelta
+
 from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
 
-from .conftest import setup_integration
+from .conftest import create_mock_session, setup_integration
 
 
 async def test_temperature_number_created(hass: HomeAssistant):
@@ -24,3 +29,80 @@ async def test_temperature_number_attributes(hass: HomeAssistant):
     assert state.attributes.get("min") == 15.0
     assert state.attributes.get("max") == 30.0
     assert state.attributes.get("step") == 0.5
+
+
+async def test_temperature_optimistic_and_read_back(hass: HomeAssistant):
+    """Test that a set value shows at once and one read-back reconciles it."""
+    mock_session = create_mock_session()
+    await setup_integration(hass, mock_session)
+    device_requests = len(mock_session.calls)
+
+    for value in (24.0, 24.5, 25.0):
+        await hass.services.async_call(
+            "number",
+            "set_value",
+            {
+                "entity_id": "number.jablotron_futura_control_temperature",
+                "value": value,
+            },
+            blocking=True,
+        )
+        state = hass.states.get("number.jablotron_futura_control_temperature")
+        assert state.state == str(value)
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=5))
+    await hass.async_block_till_done()
+
+    # The mocked unit still reports the old setpoint, so the value rolls back
+    state = hass.states.get("number.jablotron_futura_control_temperature")
+    assert state.state == "22.0"
+    assert [
+        endpoint for endpoint, _ in mock_session.calls[device_requests:]
+    ].count("getDevice.json") == 1
+
+
+async def test_optimistic_value_kept_through_older_refresh(hass: HomeAssistant):
+    """Test that a refresh started before a write keeps the set value."""
+    gate = asyncio.Event()
+    gate.set()
+    mock_session = create_mock_session(device_gate=gate)
+    entry = await setup_integration(hass, mock_session)
+
+    gate.clear()
+    running = hass.async_create_task(entry.runtime_data.async_refresh())
+    await asyncio.sleep(0)
+    await hass.services.async_call(
+        "number",
+        "set_value",
+        {"entity_id": "number.jablotron_futura_control_temperature", "value": 24.0},
+        blocking=True,
+    )
+    gate.set()
+    await running
+
+    state = hass.states.get("number.jablotron_futura_control_temperature")
+    assert state.state == "24.0"
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=5))
+    await hass.async_block_till_done()
+
+    state = hass.states.get("number.jablotron_futura_control_temperature")
+    assert state.state == "22.0"
+
+
+async def test_optimistic_value_kept_through_failed_refresh(hass: HomeAssistant):
+    """Test that a failed refresh after a write keeps the set value."""
+    mock_session = create_mock_session(device_status=[200, 500, 500, 500, 200])
+    entry = await setup_integration(hass, mock_session)
+
+    await hass.services.async_call(
+        "number",
+        "set_value",
+        {"entity_id": "number.jablotron_futura_control_temperature", "value": 24.0},
+        blocking=True,
+    )
+    await entry.runtime_data.async_refresh()
+
+    assert not entry.runtime_data.last_update_success
+    state = hass.states.get("number.jablotron_futura_control_temperature")
+    assert state.state == "24.0"
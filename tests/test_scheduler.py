@@ -0,0 +1,63 @@
+"""Tests for the Jablotron Futura adaptive polling scheduler."""
+from __future__ import annotations
+
+from copy import deepcopy
+from datetime import timedelta
+
+from custom_components.jablotron_futura.futura import FuturaSnapshot
+from custom_components.jablotron_futura.scheduler import FuturaPollScheduler
+
+from .conftest import MOCK_DEVICE_RESPONSE
+
+MIN_INTERVAL = timedelta(minutes=1)
+MAX_INTERVAL = timedelta(minutes=10)
+
+
+def create_snapshot(co2: float = 650.3) -> dict[str, FuturaSnapshot]:
+    device = deepcopy(MOCK_DEVICE_RESPONSE["device"])
+    device["peripheries"][0]["extended_properties"]["value"] = co2
+    return {"12345": FuturaSnapshot.from_device(device)}
+
+
+def test_backs_off_while_stable():
+    """Test that the interval grows towards the ceiling while nothing moves."""
+    scheduler = FuturaPollScheduler(MIN_INTERVAL, MAX_INTERVAL)
+
+    intervals = [scheduler.success(create_snapshot()) for _ in range(10)]
+
+    assert intervals[0] > MIN_INTERVAL
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == MAX_INTERVAL
+
+
+def test_polls_fast_after_write_and_rising_co2():
+    """Test that writes and a steep CO2 rise return to the fastest interval."""
+    scheduler = FuturaPollScheduler(MIN_INTERVAL, MAX_INTERVAL)
+    for _ in range(10):
+        scheduler.success(create_snapshot())
+
+    scheduler.poll_fast()
+    assert scheduler.success(create_snapshot()) == MIN_INTERVAL
+
+    scheduler = FuturaPollScheduler(MIN_INTERVAL, MAX_INTERVAL)
+    for _ in range(10):
+        scheduler.success(create_snapshot())
+    assert scheduler.success(create_snapshot(co2=900)) == MIN_INTERVAL
+
+
+def test_backs_off_further_on_errors():
+    """Test that failures back off beyond the ceiling, with bounded jitter."""
+    scheduler = FuturaPollScheduler(MIN_INTERVAL, MAX_INTERVAL)
+
+    intervals = [scheduler.failure() for _ in range(10)]
+
+    assert intervals[0] >= MIN_INTERVAL * 2
+    assert MAX_INTERVAL * 2 <= intervals[-1] <= MAX_INTERVAL * 2.4
+
+
+def test_waits_as_long_as_api_asks():
+    """Test that a Retry-After or open circuit stretches the failure interval."""
+    scheduler = FuturaPollScheduler(MIN_INTERVAL, MAX_INTERVAL)
+
+    assert scheduler.failure(retry_after=3600) == timedelta(hours=1)
+    assert scheduler.failure(retry_after=1) >= MIN_INTERVAL * 4
@@ -1,9 +1,47 @@
 """Tests for the Jablotron Futura sensor platform."""
 from __future__ import annotations
 
+from copy import deepcopy
+from datetime import timedelta
+
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.jablotron_futura.const import (
+    CONF_MAX_STATE_AGE,
+    CONF_SERVICE_ID,
+    DOMAIN,
+)
+from custom_components.jablotron_futura.sensor import (
+    SUMMARY_SENSORS,
+    FuturaSensorEntity,
+)
+
+from .conftest import (
+    MOCK_CONFIG,
+    MOCK_DEVICE_RESPONSE,
+    MOCK_SECOND_SERVICE_LIST_RESPONSE,
+    create_device_response,
+    create_mock_entry,
+    create_mock_session,
+    setup_integration,
+)
+
 
-from .conftest import setup_integration
+def create_periphery_response(**values: float) -> dict:
+    """Create a device response with changed periphery values."""
+    response = deepcopy(MOCK_DEVICE_RESPONSE)
+    for periphery in response["device"]["peripheries"]:
+        if periphery["id"] in values:
+            periphery["extended_properties"]["value"] = values[periphery["id"]]
+    return response
 
 
 async def test_summary_sensors_created(hass: HomeAssistant):
@@ -42,3 +80,165 @@ async def test_periphery_sensors_created(hass: HomeAssistant):
     state = hass.states.get("sensor.jablotron_futura_fut_temp_outdoor")
     assert state is not None
     assert state.state == "8.1"  # rounded from 8.12
+
+
+async def test_unchanged_states_not_written(hass: HomeAssistant):
+    """Test that a refresh only writes states whose exposed fields changed."""
+    jitter = deepcopy(MOCK_DEVICE_RESPONSE)
+    jitter["device"]["peripheries"][2]["extended_properties"]["value"] = 22.36
+    changed = deepcopy(jitter)
+    changed["device"]["summary"]["filter_health"] = 80
+    entry = await setup_integration(
+        hass,
+        create_mock_session(
+            device_response=[MOCK_DEVICE_RESPONSE, jitter, changed]
+        ),
+    )
+    coordinator = entry.runtime_data
+    entity_count = len(hass.states.async_all())
+    indoor = hass.states.get("sensor.jablotron_futura_fut_temp_indoor")
+
+    await coordinator.async_refresh()
+
+    assert coordinator.writes_emitted == 0
+    assert coordinator.writes_skipped == entity_count
+    state = hass.states.get("sensor.jablotron_futura_fut_temp_indoor")
+    assert state.last_reported == indoor.last_reported
+
+    await coordinator.async_refresh()
+
+    assert coordinator.writes_emitted == 1
+    assert coordinator.writes_skipped == entity_count - 1
+    assert hass.states.get("sensor.jablotron_futura_filter_health").state == "80"
+
+
+async def test_changes_within_deadband_not_published(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+):
+    """Test that a value is published past its deadband or after the max age."""
+    responses = [
+        MOCK_DEVICE_RESPONSE,
+        create_periphery_response(fut_humi_indoor=45.9),
+        create_periphery_response(fut_humi_indoor=46.0),
+        create_periphery_response(fut_humi_indoor=46.5),
+    ]
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Futura 2",
+        data=MOCK_CONFIG,
+        options={"fut_humi_indoor_deadband": 0.5, CONF_MAX_STATE_AGE: 600},
+    )
+    await setup_integration(
+        hass, create_mock_session(device_response=responses), entry
+    )
+    coordinator = entry.runtime_data
+
+    await coordinator.async_refresh()
+    assert hass.states.get("sensor.jablotron_futura_fut_humi_indoor").state == "45.7"
+
+    freezer.tick(timedelta(seconds=600))
+    await coordinator.async_refresh()
+    assert hass.states.get("sensor.jablotron_futura_fut_humi_indoor").state == "46.0"
+
+    await coordinator.async_refresh()
+    assert hass.states.get("sensor.jablotron_futura_fut_humi_indoor").state == "46.5"
+
+
+async def test_sensor_precision_option(hass: HomeAssistant):
+    """Test that sensors are rounded to the configured number of decimals."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Futura 2",
+        data=MOCK_CONFIG,
+        options={"fut_temp_outdoor_precision": 2, "device_consumption_precision": 0},
+    )
+    await setup_integration(hass, entry=entry)
+
+    assert hass.states.get("sensor.jablotron_futura_fut_temp_outdoor").state == "8.12"
+    assert hass.states.get("sensor.jablotron_futura_device_consumption").state == "45"
+
+
+async def test_api_health_sensors(hass: HomeAssistant, freezer: FrozenDateTimeFactory):
+    """Test that the opt-in API health sensors report the client metrics."""
+    entity_registry = er.async_get(hass)
+    entry = create_mock_entry()
+    entry.add_to_hass(hass)
+    for key in ("api_requests_per_hour", "api_consecutive_failures"):
+        entity_registry.async_get_or_create(
+            "sensor",
+            DOMAIN,
+            "SN123456789_{}".format(key),
+            config_entry=entry,
+            suggested_object_id="jablotron_futura_{}".format(key),
+        )
+    entry = await setup_integration(
+        hass, create_mock_session(device_status=[200] + [503] * 20), entry
+    )
+    coordinator = entry.runtime_data
+
+    disabled = entity_registry.async_get("sensor.jablotron_futura_api_response_bytes")
+    assert disabled.disabled_by is er.RegistryEntryDisabler.INTEGRATION
+    assert disabled.entity_category is EntityCategory.DIAGNOSTIC
+    assert hass.states.get("sensor.jablotron_futura_api_requests_per_hour").state == "3"
+    sync_seconds = coordinator.futura.metrics.sync_seconds
+
+    await coordinator.async_refresh()
+    # Consecutive failures do not notify entities, the poll picks them up
+    await coordinator.async_refresh()
+    freezer.tick(timedelta(minutes=1))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+    state = hass.states.get("sensor.jablotron_futura_api_consecutive_failures")
+    assert state.state == "2"
+    assert state.attributes.get("stale") is None
+    # Failed syncs do not count as the last refresh
+    assert coordinator.futura.metrics.sync_seconds == sync_seconds
+
+
+async def test_api_health_sensors_once_per_account(hass: HomeAssistant):
+    """Test that account-wide health sensors are not repeated per entry or unit."""
+    mock_session = create_mock_session(
+        service_list_response=MOCK_SECOND_SERVICE_LIST_RESPONSE,
+        devices={
+            "12345": MOCK_DEVICE_RESPONSE,
+            "67890": create_device_response("67890", "SN987654321"),
+        },
+    )
+    entries = [
+        MockConfigEntry(
+            domain=DOMAIN,
+            title="Futura 2",
+            data=MOCK_CONFIG | {CONF_SERVICE_ID: service_id},
+            unique_id=service_id,
+        )
+        for service_id in ("12345", "67890")
+    ]
+    for entry in entries:
+        await setup_integration(hass, mock_session, entry)
+
+    unique_ids = [
+        entity.unique_id
+        for entity in er.async_get(hass).entities.values()
+        if entity.unique_id.split("_", 1)[1].startswith("api_")
+    ]
+    assert sorted(unique_ids) == [
+        "SN123456789_api_consecutive_failures",
+        "SN123456789_api_get_device_latency",
+        "SN123456789_api_last_refresh_duration",
+        "SN123456789_api_last_successful_sync",
+        "SN123456789_api_requests_per_hour",
+        "SN123456789_api_response_bytes",
+        "SN987654321_api_consecutive_failures",
+        "SN987654321_api_last_successful_sync",
+    ]
+
+
+def test_sensor_requires_fetched_value():
+    """Test that a Futura sensor without a fetched value cannot be created."""
+
+    class ValuelessSensorEntity(FuturaSensorEntity):
+        pass
+
+    with pytest.raises(TypeError, match="_fetched_value"):
+        ValuelessSensorEntity(None, "12345", SUMMARY_SENSORS[0], {})
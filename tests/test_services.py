@@ -0,0 +1,64 @@
+"""Tests for the Jablotron Futura services."""
+from __future__ import annotations
+
+import cProfile
+from pathlib import Path
+import pstats
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.jablotron_futura.const import DOMAIN, SERVICE_PROFILE
+
+from .conftest import create_mock_session, setup_integration
+
+
+async def test_profile_refreshes(hass: HomeAssistant, tmp_path: Path):
+    """Test that the profile service captures the next refreshes and their updates."""
+    hass.config.config_dir = str(tmp_path)
+    entry = await setup_integration(hass, create_mock_session())
+    coordinator = entry.runtime_data
+
+    await hass.services.async_call(
+        DOMAIN, SERVICE_PROFILE, {"refreshes": 2, "top": 10}, blocking=True
+    )
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(DOMAIN, SERVICE_PROFILE, {}, blocking=True)
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    [stats_path] = tmp_path.glob("jablotron_futura_profile_*.prof")
+    functions = {
+        function for _, _, function in pstats.Stats(str(stats_path)).stats
+    }
+    assert {"_async_sync", "async_update_listeners"} <= functions
+    summary = stats_path.with_suffix(".txt").read_text(encoding="utf-8")
+    assert "jablotron_futura" in summary
+
+    # Later refreshes run without the profiler
+    await coordinator.async_refresh()
+    assert coordinator.profiler is None
+
+
+async def test_profile_cancelled_by_other_profiler(hass: HomeAssistant, tmp_path: Path):
+    """Test that refreshes keep working when another profiler is active."""
+    hass.config.config_dir = str(tmp_path)
+    entry = await setup_integration(hass, create_mock_session())
+    coordinator = entry.runtime_data
+    await hass.services.async_call(DOMAIN, SERVICE_PROFILE, {}, blocking=True)
+
+    other = cProfile.Profile()
+    other.enable()
+    try:
+        await coordinator.async_refresh()
+    finally:
+        other.disable()
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert coordinator.last_update_success
+    assert coordinator.profiler is None
+    assert not list(tmp_path.glob("jablotron_futura_profile_*"))
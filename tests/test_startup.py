@@ -0,0 +1,86 @@
+"""Startup benchmarks for the Jablotron Futura integration.
+
+The budgets are generous so the tests stay reliable on slow CI runners; they
+catch regressions such as a module loaded twice or a heavy import moved back
+to module level, not small slowdowns. Measured values are attached to the
+test report as properties.
+"""
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import time
+
+from homeassistant.core import HomeAssistant
+
+from .conftest import setup_integration
+
+PACKAGE = "custom_components.jablotron_futura"
+PLATFORMS = ["binary_sensor", "number", "select", "sensor", "switch"]
+
+# Seconds spent importing the package and its platforms on top of what
+# Home Assistant itself has loaded before setting up the integration
+IMPORT_BUDGET = 0.5
+# Seconds for async_setup_entry against a mocked cloud, platforms included
+SETUP_BUDGET = 1.0
+
+# Imported by Home Assistant before any custom integration is loaded
+HOME_ASSISTANT_MODULES = [
+    "homeassistant.config_entries",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+    *("homeassistant.components.{}".format(platform) for platform in PLATFORMS),
+]
+
+COLD_IMPORT = """
+import importlib, json, sys, time
+for module in {preload!r}:
+    importlib.import_module(module)
+start = time.perf_counter()
+for module in {modules!r}:
+    importlib.import_module(module)
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "modules": sorted(sys.modules),
+}}))
+"""
+
+
+def _cold_import() -> dict:
+    modules = [PACKAGE, *("{}.{}".format(PACKAGE, platform) for platform in PLATFORMS)]
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            COLD_IMPORT.format(preload=HOME_ASSISTANT_MODULES, modules=modules),
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_cold_import_time(record_property):
+    """Test that importing the package in a fresh interpreter stays cheap."""
+    result = _cold_import()
+    record_property("cold_import_seconds", round(result["seconds"], 4))
+
+    # Platforms import the package's modules, never __init__ a second time
+    assert "{}.__init__".format(PACKAGE) not in result["modules"]
+    # The cloud transport creates its own session without this helper
+    assert "homeassistant.helpers.aiohttp_client" not in result["modules"]
+    assert result["seconds"] < IMPORT_BUDGET
+
+
+async def test_setup_entry_time(hass: HomeAssistant, record_property):
+    """Test that setting up an entry against a mocked cloud is fast."""
+    start = time.perf_counter()
+    await setup_integration(hass)
+    elapsed = time.perf_counter() - start
+    record_property("setup_entry_seconds", round(elapsed, 4))
+
+    assert "{}.__init__".format(PACKAGE) not in sys.modules
+    assert elapsed < SETUP_BUDGET
@@ -0,0 +1,38 @@
+"""Tests for the Jablotron Futura switch platform."""
+from __future__ import annotations
+
+from copy import deepcopy
+
+from homeassistant.core import HomeAssistant
+
+from .conftest import (
+    MOCK_DEVICE_RESPONSE,
+    create_mock_session,
+    setup_integration,
+)
+
+
+async def test_settings_switches_created(hass: HomeAssistant):
+    """Test that settings switch entities are created with correct states."""
+    await setup_integration(hass)
+
+    state = hass.states.get("switch.jablotron_futura_bypass")
+    assert state is not None
+    assert state.state == "on"
+
+    state = hass.states.get("switch.jablotron_futura_cooling")
+    assert state is not None
+    assert state.state == "off"
+
+
+async def test_settings_switch_missing_setting(hass: HomeAssistant):
+    """Test that a switch without a matching setting is unavailable."""
+    device_response = deepcopy(MOCK_DEVICE_RESPONSE)
+    del device_response["device"]["settings"]["extended_properties"]["cooling"]
+    await setup_integration(
+        hass, create_mock_session(device_response=device_response)
+    )
+
+    state = hass.states.get("switch.jablotron_futura_cooling")
+    assert state is not None
+    assert state.state == "unavailable"